@@ -1,11 +1,20 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import uvicorn
+from contextlib import asynccontextmanager
+import asyncio
+import orjson
 import os
-from datetime import datetime
+import tempfile
+import time
+from datetime import date, datetime, timezone
+import numpy as np
+import pandas as pd
 import logging
 from dotenv import load_dotenv
 
@@ -14,24 +23,85 @@ load_dotenv()
 
 # Import our custom modules
 from models import (
-    FileUploadResponse, AIAnalysisResponse, ChartDataRequest, 
-    ChartDataResponse, ErrorResponse, ChartSuggestion, ChartType, ChartParameters
+    FileUploadResponse, AIAnalysisResponse, ChartDataRequest, ChartDataBatchRequest,
+    ChartDataResponse, ErrorResponse, ChartSuggestion, ChartType, ChartParameters, DataShape
 )
 from services.file_processing import FileProcessingService, file_storage
 from services.ai_analysis import AIAnalysisService
 from services.chart_data import ChartDataService
 
-# Configure logging
+# Configure logging for the application; service modules only create their loggers
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chart requests for the same file run concurrently on one shared DataFrame; with
+# copy-on-write, column selections are lazy views and no handler can mutate the cached frame
+pd.set_option("mode.copy_on_write", True)
+
+def orjson_default(obj):
+    """Serialize the pandas/numpy values orjson does not handle natively"""
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (pd.Timestamp, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib json module"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+# Charts with more points than this are streamed, a chunk of rows at a time
+STREAM_MIN_POINTS = 50000
+STREAM_CHUNK_POINTS = 10000
+
+def stream_chart_json(payload: Dict[str, Any]) -> Iterator[bytes]:
+    """Serialize a chart payload to JSON, emitting its data rows in chunks"""
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    data = payload["data"]
+    yield b'{"data":['
+    for start in range(0, len(data), STREAM_CHUNK_POINTS):
+        chunk = orjson.dumps(
+            data[start:start + STREAM_CHUNK_POINTS], default=orjson_default, option=option
+        )
+        # Drop the chunk's own brackets; rows are joined into the single outer array
+        yield (b"," if start else b"") + chunk[1:-1]
+    rest = orjson.dumps(
+        {key: value for key, value in payload.items() if key != "data"},
+        default=orjson_default,
+        option=option
+    )
+    yield b"]," + rest[1:]
+
+def chart_response(payload: Dict[str, Any]):
+    """Return small charts as one JSON body and stream large ones"""
+    if len(payload["data"]) > STREAM_MIN_POINTS:
+        return StreamingResponse(stream_chart_json(payload), media_type="application/json")
+    return OrjsonResponse(payload)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the pooled OpenAI connections on shutdown"""
+    yield
+    await ai_service.aclose()
+
 # Create FastAPI instance
 app = FastAPI(
     title="Análisis al Instante API",
     description="API for instant data analysis and visualization with AI-powered insights",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=OrjsonResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -43,9 +113,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (chart payloads repeat the same keys on every row)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Initialize services
 ai_service = AIAnalysisService()
 
+# Base chart titles, formatted once per chart type
+CHART_TITLES = {chart_type: f"{chart_type.value.title()} Chart" for chart_type in ChartType}
+
+def chart_title(chart_type: ChartType, parameters: ChartParameters) -> str:
+    """Build a chart title from its type and axes"""
+    title = CHART_TITLES[chart_type]
+    if parameters.x_axis:
+        title += f" - {parameters.x_axis}"
+    if parameters.y_axis:
+        title += f" vs {parameters.y_axis}"
+    return title
+
+
+def utc_timestamp() -> str:
+    """Current UTC time as an ISO 8601 string with second precision"""
+    return datetime.fromtimestamp(time.time(), timezone.utc).isoformat(timespec="seconds")
+
+
 # Legacy models for backward compatibility
 class HealthResponse(BaseModel):
     status: str
@@ -93,34 +184,51 @@ async def upload_file(file: UploadFile = File(...)):
         if hasattr(file, 'size'):
             file_size = file.size
         
-        is_valid, message = FileProcessingService.validate_file(file.filename, file_size)
+        # Sniff the leading bytes so mislabelled files are rejected before the body is read
+        head = await file.read(FileProcessingService.PEEK_SIZE)
+        is_valid, message = FileProcessingService.validate_file(file.filename, file_size or 0, peek=head)
         if not is_valid:
             raise HTTPException(status_code=400, detail=message)
         
-        # Read file content
-        content = await file.read()
+        # Stream the upload to a temporary file instead of buffering it in memory
+        suffix = os.path.splitext(file.filename)[1].lower()
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        try:
+            with tmp:
+                tmp.write(head)
+                received = len(head)
+                while chunk := await file.read(FileProcessingService.UPLOAD_CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > FileProcessingService.MAX_FILE_SIZE:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"File size exceeds maximum allowed size of {FileProcessingService.MAX_FILE_SIZE // (1024 * 1024)}MB"
+                        )
+                    tmp.write(chunk)
+            
+            # Process file
+            file_id, df, metadata = await FileProcessingService.process_path(tmp.name, file.filename)
+        finally:
+            os.unlink(tmp.name)
         
-        # Process file
-        file_id, df, metadata = await FileProcessingService.process_file(content, file.filename)
-        
-        # Create response
-        response = FileUploadResponse(
+        # Create response (fields come straight from our own metadata, so skip re-validation)
+        response = FileUploadResponse.model_construct(
             file_id=file_id,
             filename=metadata["filename"],
             columns=metadata["columns"],
             data_types=metadata["data_types"],
-            shape=metadata["shape"],
+            shape=DataShape(*metadata["shape"]),
             summary_stats=metadata.get("summary_stats", {}),
             message=f"File processed successfully. {df.shape[0]} rows, {df.shape[1]} columns."
         )
         
-        logger.info(f"File upload successful: {file.filename} -> {file_id}")
+        logger.info("File upload successful: %s -> %s", file.filename, file_id)
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"File upload error: {str(e)}")
+        logger.error("File upload error: %s", e)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 # AI Analysis endpoint
@@ -130,14 +238,13 @@ async def analyze_file_with_ai(file_id: str):
     Analyze uploaded file using AI to generate visualization suggestions
     """
     try:
-        # Check if file exists
-        if file_id not in file_storage:
+        # Check if file exists (a cache miss reloads the Parquet file off the event loop)
+        entry = await run_in_threadpool(file_storage.get, file_id)
+        if entry is None:
             raise HTTPException(status_code=404, detail="File not found")
         
-        df = file_storage[file_id]
-        
-        # Generate metadata for AI analysis
-        metadata = FileProcessingService._generate_metadata(df, f"file_{file_id}")
+        df = entry["df"]
+        metadata = entry["metadata"]
         
         # Get AI suggestions
         suggestions = await ai_service.analyze_data(file_id, df, metadata)
@@ -146,25 +253,57 @@ async def analyze_file_with_ai(file_id: str):
         response = AIAnalysisResponse(
             file_id=file_id,
             suggestions=suggestions,
-            data_overview={
-                "total_rows": df.shape[0],
-                "total_columns": df.shape[1],
-                "numeric_columns": metadata.get("numeric_columns", []),
-                "categorical_columns": metadata.get("categorical_columns", []),
-                "missing_values_count": sum(metadata.get("missing_values", {}).values())
-            },
-            analysis_timestamp=datetime.now().isoformat()
+            data_overview=entry["overview"],
+            analysis_timestamp=utc_timestamp()
         )
         
-        logger.info(f"AI analysis completed for file {file_id}: {len(suggestions)} suggestions")
+        logger.info("AI analysis completed for file %s: %s suggestions", file_id, len(suggestions))
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"AI analysis error: {str(e)}")
+        logger.error("AI analysis error: %s", e)
         raise HTTPException(status_code=500, detail=f"Error analyzing file: {str(e)}")
 
+# Batch AI Analysis endpoint
+@app.post("/analyze-batch", response_model=List[AIAnalysisResponse])
+async def analyze_files_with_ai(file_ids: List[str]):
+    """
+    Analyze several uploaded files at once; OpenAI calls for different files run concurrently
+    """
+    try:
+        file_ids = list(dict.fromkeys(file_ids))
+        found = await asyncio.gather(
+            *(run_in_threadpool(file_storage.get, file_id) for file_id in file_ids)
+        )
+        missing = [file_id for file_id, entry in zip(file_ids, found) if entry is None]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Files not found: {', '.join(missing)}")
+        
+        entries = dict(zip(file_ids, found))
+        suggestions_by_file = await ai_service.analyze_many(entries)
+        
+        timestamp = utc_timestamp()
+        responses = [
+            AIAnalysisResponse(
+                file_id=file_id,
+                suggestions=suggestions_by_file[file_id],
+                data_overview=entry["overview"],
+                analysis_timestamp=timestamp
+            )
+            for file_id, entry in entries.items()
+        ]
+        
+        logger.info("Batch AI analysis completed for %s files", len(responses))
+        return responses
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Batch AI analysis error: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error analyzing files: {str(e)}")
+
 # Chart data endpoint
 @app.post("/chart-data", response_model=ChartDataResponse)
 async def get_chart_data(request: ChartDataRequest):
@@ -173,24 +312,22 @@ async def get_chart_data(request: ChartDataRequest):
     """
     try:
         # Check if file exists
-        if request.file_id not in file_storage:
+        entry = await run_in_threadpool(file_storage.get, request.file_id)
+        if entry is None:
             raise HTTPException(status_code=404, detail="File not found")
         
-        df = file_storage[request.file_id]
+        df = entry["df"]
         
-        # Generate chart data
-        chart_data = ChartDataService.get_chart_data(
-            request.file_id, 
-            request.chart_type, 
+        # Generate chart data in the threadpool so pandas work doesn't block the event loop
+        chart_data = await run_in_threadpool(
+            ChartDataService.get_chart_data,
+            request.file_id,
+            request.chart_type,
             request.parameters
         )
         
         # Create title based on chart type and parameters
-        title = f"{request.chart_type.value.title()} Chart"
-        if request.parameters.x_axis:
-            title += f" - {request.parameters.x_axis}"
-        if request.parameters.y_axis:
-            title += f" vs {request.parameters.y_axis}"
+        title = chart_title(request.chart_type, request.parameters)
         
         # Generate AI insights
         ai_insights = await ai_service.generate_chart_insight(
@@ -201,22 +338,73 @@ async def get_chart_data(request: ChartDataRequest):
             df
         )
         
-        response = ChartDataResponse(
-            chart_type=request.chart_type,
-            data=chart_data["data"],
-            metadata=chart_data["metadata"],
-            title=title,
-            insight=ai_insights["insight"],
-            interpretation=ai_insights["interpretation"]
+        logger.info("Chart data with AI insights generated: %s for file %s", request.chart_type, request.file_id)
+        
+        # Return the response directly; the chart rows are already plain dicts, so
+        # walking them through ChartDataResponse validation would only cost time.
+        # Large charts are streamed so the first rows go out while the rest encode
+        return chart_response({
+            "chart_type": request.chart_type.value,
+            "data": chart_data["data"],
+            "metadata": chart_data["metadata"],
+            "title": title,
+            "insight": ai_insights["insight"],
+            "interpretation": ai_insights["interpretation"]
+        })
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Chart data error: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error generating chart data: {str(e)}")
+
+# Generate several charts of one file in a single request
+@app.post("/chart-data-batch", response_model=List[ChartDataResponse])
+async def get_chart_data_batch(request: ChartDataBatchRequest):
+    """
+    Get formatted data for several charts of one file, with AI insights from a single request
+    """
+    try:
+        entry = await run_in_threadpool(file_storage.get, request.file_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        df = entry["df"]
+        charts = [(chart.chart_type, chart.parameters) for chart in request.charts]
+        
+        # Charts are generated in parallel on the chart worker pool
+        chart_results = await run_in_threadpool(
+            ChartDataService.get_charts_batch, request.file_id, charts
         )
         
-        logger.info(f"Chart data with AI insights generated: {request.chart_type} for file {request.file_id}")
-        return response
+        # One OpenAI request describes every chart of the batch
+        ai_insights = await ai_service.generate_chart_insights_batch([
+            (chart_type, parameters, chart_data, df)
+            for (chart_type, parameters), chart_data in zip(charts, chart_results)
+        ])
+        
+        logger.info("Batch of %s charts generated for file %s", len(charts), request.file_id)
+        
+        return OrjsonResponse([
+            {
+                "chart_type": chart_type.value,
+                "data": chart_data["data"],
+                "metadata": chart_data["metadata"],
+                "title": chart_title(chart_type, parameters),
+                "insight": insights["insight"],
+                "interpretation": insights["interpretation"]
+            }
+            for (chart_type, parameters), chart_data, insights in zip(
+                charts, chart_results, ai_insights
+            )
+        ])
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Chart data error: {str(e)}")
+        logger.error("Chart data batch error: %s", e)
         raise HTTPException(status_code=500, detail=f"Error generating chart data: {str(e)}")
 
 # Get file info endpoint
@@ -224,11 +412,12 @@ async def get_chart_data(request: ChartDataRequest):
 async def get_file_info(file_id: str):
     """Get information about an uploaded file"""
     try:
-        if file_id not in file_storage:
+        entry = await run_in_threadpool(file_storage.get, file_id)
+        if entry is None:
             raise HTTPException(status_code=404, detail="File not found")
         
-        df = file_storage[file_id]
-        metadata = FileProcessingService._generate_metadata(df, f"file_{file_id}")
+        df = entry["df"]
+        metadata = entry["metadata"]
         
         return {
             "file_id": file_id,
@@ -241,9 +430,21 @@ async def get_file_info(file_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Get file info error: {str(e)}")
+        logger.error("Get file info error: %s", e)
         raise HTTPException(status_code=500, detail=f"Error retrieving file info: {str(e)}")
 
+# Delete file endpoint
+@app.delete("/files/{file_id}")
+async def delete_file(file_id: str):
+    """Remove an uploaded file from the cache and its Parquet spill"""
+    removed = await run_in_threadpool(file_storage.invalidate, file_id)
+    ChartDataService.invalidate(file_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    logger.info("File deleted: %s", file_id)
+    return {"file_id": file_id, "message": "File deleted successfully"}
+
 # Legacy endpoints for backward compatibility
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze_data(request: AnalysisRequest):
@@ -262,7 +463,7 @@ async def get_analysis(analysis_id: str):
         "id": analysis_id,
         "status": "completed",
         "result": "Legacy analysis result",
-        "created_at": datetime.now().isoformat()
+        "created_at": utc_timestamp()
     }
 
 if __name__ == "__main__":
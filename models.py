@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, NamedTuple, Optional, Dict, Any, Union
 from enum import Enum
 
 class ChartType(str, Enum):
@@ -39,16 +39,24 @@ class ChartType(str, Enum):
     MULTI_LINE = "multi_line"
     STACKED_AREA = "stacked_area"
 
+class DataShape(NamedTuple):
+    rows: int
+    columns: int
+
 class FileUploadResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     file_id: str
     filename: str
     columns: List[str]
     data_types: Dict[str, str]
-    shape: tuple[int, int]
+    shape: DataShape
     summary_stats: Dict[str, Any]
     message: str
 
 class ChartParameters(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     # Basic axes
     x_axis: Optional[str] = None
     y_axis: Optional[str] = None
@@ -85,9 +93,11 @@ class ChartParameters(BaseModel):
     cumulative: Optional[bool] = False
     
     # Custom parameters for specific chart types
-    additional_params: Optional[Dict[str, Any]] = {}
+    additional_params: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
 class ChartSuggestion(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     title: str
     chart_type: ChartType
     parameters: ChartParameters
@@ -95,17 +105,35 @@ class ChartSuggestion(BaseModel):
     priority: Optional[int] = Field(default=1, description="Priority ranking (1-5)")
 
 class AIAnalysisResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     file_id: str
     suggestions: List[ChartSuggestion]
     data_overview: Dict[str, Any]
     analysis_timestamp: str
 
 class ChartDataRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     file_id: str
     chart_type: ChartType
     parameters: ChartParameters
 
+class ChartSpec(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    chart_type: ChartType
+    parameters: ChartParameters
+
+class ChartDataBatchRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    file_id: str
+    charts: List[ChartSpec]
+
 class ChartDataResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     chart_type: ChartType
     data: List[Dict[str, Any]]
     metadata: Dict[str, Any]
@@ -114,11 +142,15 @@ class ChartDataResponse(BaseModel):
     interpretation: Optional[str] = None
 
 class ErrorResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     error: str
     detail: str
     code: Optional[str] = None
 
 class DataSummary(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     total_rows: int
     total_columns: int
     numeric_columns: List[str]
@@ -1,39 +1,311 @@
-import json
+import asyncio
+import hashlib
+import importlib.util
 import logging
 import os
-from typing import Any, Dict, List
-
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import orjson
 import pandas as pd
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
 from models import ChartParameters, ChartSuggestion, ChartType
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-# In-memory cache for analysis results
-analysis_cache: Dict[str, Any] = {}
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Concurrent OpenAI requests per service instance, and retries (with the client's
+# exponential backoff) on rate limits and transient errors
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+
+# System messages shared by every request, so the prompt prefix stays identical
+ANALYSIS_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert data analyst. Analyze the provided dataset and suggest the most insightful visualizations.",
+}
+CHART_INSIGHT_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a data analyst expert. Analyze the provided chart and data to generate meaningful insights.",
+}
+
+# Prompt templates, parsed once at import and filled in per request
+ANALYSIS_PROMPT_TEMPLATE = """
+Analyze this dataset and suggest 3-5 specific visualizations that would reveal the most interesting patterns and insights:
+
+{data_summary}
+
+Please respond with a JSON object of the form {{"suggestions": [...]}} where each array item represents a chart suggestion with these exact keys:
+- "title": A descriptive title for the chart
+- "chart_type": One of: "bar", "line", "pie", "scatter", "histogram", "box", "heatmap"
+- "parameters": An object with chart parameters like {{"x_axis": "column_name", "y_axis": "column_name", "aggregation": "sum"}}
+- "insight": A brief explanation of what this visualization would reveal
+- "priority": A number from 1-5 indicating importance (5 being most important)
+
+Focus on:
+1. Identifying relationships between variables
+2. Highlighting distributions and outliers
+3. Showing trends over time (if applicable)
+4. Comparing categories or groups
+5. Revealing correlations
+
+Ensure the suggested columns exist in the dataset and the chart types are appropriate for the data types.
+"""
+
+CHART_INSIGHT_PROMPT_TEMPLATE = """
+Analyze the following {count} data visualization(s) and provide insights for each:
+
+{chart_contexts}
+
+For each chart provide:
+1. INSIGHT: A brief, actionable insight about what this chart reveals (1-2 sentences)
+2. INTERPRETATION: A detailed explanation of the patterns, trends, or relationships shown (2-3 sentences)
+
+Focus on:
+- Key patterns or trends visible in the data
+- Notable outliers or anomalies
+- Business implications or actionable insights
+- Relationships between variables
+
+Respond with a JSON object of the form {{"charts": [{{"insight": "...", "interpretation": "..."}}]}}
+where "charts" holds exactly {count} entries, in the same order as the charts above.
+"""
+
+# "INSIGHT: ..." / "INTERPRETATION: ..." lines in plain-text insight replies
+LABEL_PATTERN = re.compile(r"^(INSIGHT|INTERPRETATION):[ \t]*(.*)$", re.MULTILINE)
+
+# Replies longer than this are parsed in a worker thread to keep the event loop free
+PARSE_IN_THREAD_CHARS = 8192
+
+# Completion tokens budgeted per chart, and charts described by one OpenAI request;
+# larger batches are split so no reply is truncated by the budget
+CHART_INSIGHT_TOKENS_PER_CHART = 500
+CHART_INSIGHT_GROUP_SIZE = 8
+
+# Columns described in the prompt's statistical summary
+SUMMARY_STATS_COLUMNS = 3
+
+# Characters of each sample row shown in the prompt; every serialized item
+# ("key":value,) takes at least 5 characters, so 20 items always fill them
+SAMPLE_ROW_CHARS = 100
+SAMPLE_ROW_ITEMS = 20
+
+# Rows of the dataset folded into the analysis cache key
+SCHEMA_HASH_ROWS = 100
+
+
+
+def _format_stat(value: Any) -> str:
+    """Format a summary statistic to two decimals, or N/A when it is missing"""
+    return f"{value:.2f}" if isinstance(value, (int, float)) else "N/A"
+
+
+class CacheStore:
+    """Chart suggestions cached in a bounded in-memory TTL cache backed by SQLite.
+
+    Misses in memory fall through to a ``(key, value, ts)`` table so suggestions
+    survive restarts and are shared by workers pointing at the same database.
+    Rows older than ``disk_ttl`` seconds are ignored and pruned on write, and
+    the table is trimmed to the ``max_rows`` most recent entries.
+    """
+
+    def __init__(self, path: str, maxsize: int, ttl: int, disk_ttl: int, max_rows: int):
+        self.memory: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk_ttl = disk_ttl
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache "
+            "(key TEXT PRIMARY KEY, value BLOB, ts INTEGER)"
+        )
+
+    @staticmethod
+    def _db_key(key: Tuple[str, str]) -> str:
+        return "\x1f".join(key)
+
+    def get(self, key: Tuple[str, str]) -> Optional[List[ChartSuggestion]]:
+        """Return cached suggestions from memory, then disk, or None on a miss"""
+        cached = self.memory.get(key)
+        if cached is not None:
+            return list(cached)
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM analysis_cache WHERE key = ? AND ts >= ?",
+                    (self._db_key(key), int(time.time()) - self.disk_ttl),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Analysis cache read failed: %s", e)
+            return None
+        if row is None:
+            return None
+
+        suggestions = tuple(ChartSuggestion(**item) for item in orjson.loads(row[0]))
+        self.memory[key] = suggestions
+        return list(suggestions)
+
+    def set(self, key: Tuple[str, str], suggestions: List[ChartSuggestion]) -> None:
+        """Cache suggestions in memory and persist them to disk"""
+        # Suggestions are frozen models; holding them in a tuple keeps callers
+        # that modify the returned list from changing the cached entry
+        self.memory[key] = tuple(suggestions)
+        value = orjson.dumps([s.model_dump(mode="json") for s in suggestions])
+        now = int(time.time())
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, ts) VALUES (?, ?, ?)",
+                    (self._db_key(key), value, now),
+                )
+                self._conn.execute(
+                    "DELETE FROM analysis_cache WHERE ts < ? OR key NOT IN "
+                    "(SELECT key FROM analysis_cache ORDER BY ts DESC LIMIT ?)",
+                    (now - self.disk_ttl, self.max_rows),
+                )
+        except sqlite3.Error as e:
+            logger.warning("Analysis cache write failed: %s", e)
+
+
+# Analysis results keyed by (schema hash, model), kept in memory and on disk
+analysis_cache = CacheStore(
+    path=os.getenv(
+        "ANALYSIS_CACHE_DB",
+        os.path.join(tempfile.gettempdir(), "analisis_cache", "analysis.sqlite3"),
+    ),
+    maxsize=1024,
+    ttl=3600,
+    disk_ttl=int(os.getenv("ANALYSIS_CACHE_TTL_HOURS", "168")) * 3600,
+    max_rows=int(os.getenv("ANALYSIS_CACHE_MAX_ROWS", "10000")),
+)
+
+# Chart insights keyed by a hash of the model and the chart context sent to it
+insight_cache: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+
+# In-flight analyses by cache key, so concurrent misses make a single OpenAI call
+_analysis_inflight: Dict[Tuple[str, str], "asyncio.Future[List[ChartSuggestion]]"] = {}
 
 
 class AIAnalysisService:
     """Service for AI-powered data analysis"""
 
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # One pooled client for the service's lifetime; HTTP/2 multiplexes the
+        # concurrent insight calls over a single connection when h2 is installed
+        self._http = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONCURRENCY * 2,
+                max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+            ),
+            timeout=httpx.Timeout(120.0, connect=5.0),
+        )
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=self._http,
+        )
+        self._semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections used for OpenAI requests"""
+        await self._http.aclose()
+
+    async def _run_parser(self, parser: Callable[..., Any], response_text: str, *args: Any) -> Any:
+        """Run a reply parser inline, or in a worker thread for large replies"""
+        if len(response_text) > PARSE_IN_THREAD_CHARS:
+            return await asyncio.to_thread(parser, response_text, *args)
+        return parser(response_text, *args)
+
+    async def _complete(self, **kwargs: Any) -> str:
+        """Stream a chat completion and return its text, capped at OPENAI_MAX_CONCURRENCY in flight.
+
+        Callers still get the whole reply at once; streaming only keeps data arriving
+        while the model generates, so a long completion is not cut off by the
+        client's read timeout. Raises ValueError when the reply hit max_tokens,
+        so a truncated reply is never parsed or cached as a valid empty result.
+        """
+        parts: List[str] = []
+        finish_reason = None
+        async with self._semaphore:
+            stream = await self.client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    parts.append(choice.delta.content)
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        if finish_reason == "length":
+            raise ValueError(f"Completion truncated at max_tokens={kwargs.get('max_tokens')}")
+        return "".join(parts)
 
     async def analyze_data(
         self, file_id: str, df: pd.DataFrame, metadata: Dict[str, Any]
     ) -> List[ChartSuggestion]:
         """Analyze data and generate chart suggestions using AI"""
+        # Datasets with the same schema and leading rows share cached suggestions
+        cache_key = (self._schema_hash(df), OPENAI_MODEL)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached analysis for %s", file_id)
+            return cached
+
+        # Concurrent misses for the same key share one OpenAI call; the task is
+        # shielded so a disconnecting caller does not cancel it for the others
+        task = _analysis_inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._analyze_uncached(file_id, df, metadata, cache_key)
+            )
+            _analysis_inflight[cache_key] = task
+            task.add_done_callback(lambda _: _analysis_inflight.pop(cache_key, None))
+        else:
+            logger.info("Joining in-flight analysis for %s", file_id)
+        return list(await asyncio.shield(task))
+
+    @staticmethod
+    def _schema_hash(df: pd.DataFrame) -> str:
+        """Hash the shape, column names, dtypes and first rows into a compact cache key"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(df.shape).encode())
+        digest.update(b";")
+        digest.update("\x1f".join(map(str, df.columns)).encode())
+        digest.update(b";")
+        digest.update("\x1f".join(map(str, df.dtypes)).encode())
+        digest.update(b";")
+        head = df.head(SCHEMA_HASH_ROWS)
+        try:
+            row_hashes = pd.util.hash_pandas_object(head, index=False)
+        except TypeError:
+            # Lists and dicts (nested JSON) are unhashable; hash their text instead
+            row_hashes = pd.util.hash_pandas_object(head.astype(str), index=False)
+        digest.update(row_hashes.to_numpy().tobytes())
+        return digest.hexdigest()
+
+    async def _analyze_uncached(
+        self,
+        file_id: str,
+        df: pd.DataFrame,
+        metadata: Dict[str, Any],
+        cache_key: Tuple[str, str],
+    ) -> List[ChartSuggestion]:
+        """Call OpenAI for chart suggestions and cache them"""
         try:
-            # Check cache first
-            cache_key = f"analysis_{file_id}"
-            if cache_key in analysis_cache:
-                logger.info(f"Returning cached analysis for {file_id}")
-                return analysis_cache[cache_key]
-
             # Prepare data summary for AI
             data_summary = self._prepare_data_summary(df, metadata)
 
@@ -41,134 +313,133 @@ class AIAnalysisService:
             prompt = self._create_analysis_prompt(data_summary)
 
             # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response_text = await self._complete(
+                model=OPENAI_MODEL,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert data analyst. Analyze the provided dataset and suggest the most insightful visualizations.",
-                    },
+                    ANALYSIS_SYSTEM_MESSAGE,
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0.7,
                 max_tokens=2000,
+                response_format={"type": "json_object"},
             )
 
             # Parse AI response
-            suggestions = self._parse_ai_response(
-                response.choices[0].message.content
-            )
+            suggestions = await self._run_parser(self._parse_ai_response, response_text)
 
-            # Cache results
-            analysis_cache[cache_key] = suggestions
+            # Cache results; an empty list means the reply was unusable, so it is retried next time
+            if suggestions:
+                analysis_cache.set(cache_key, suggestions)
 
             logger.info(
-                f"Generated {len(suggestions)} chart suggestions for {file_id}"
+                "Generated %s chart suggestions for %s", len(suggestions), file_id
             )
             return suggestions
 
         except Exception as e:
-            logger.error(f"Error in AI analysis: {str(e)}")
+            logger.error("Error in AI analysis: %s", e)
             # Return empty list when AI fails
             return []
 
+    async def analyze_many(
+        self, entries: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, List[ChartSuggestion]]:
+        """Analyze several cached files concurrently, keyed by file_id"""
+        results = await asyncio.gather(
+            *(
+                self.analyze_data(file_id, entry["df"], entry["metadata"])
+                for file_id, entry in entries.items()
+            )
+        )
+        return dict(zip(entries, results))
+
     def _prepare_data_summary(
         self, df: pd.DataFrame, metadata: Dict[str, Any]
     ) -> str:
         """Prepare a concise data summary for AI analysis"""
-        summary_parts = [
-            f"Dataset: {metadata.get('filename', 'Unknown')}",
-            f"Shape: {df.shape[0]} rows, {df.shape[1]} columns",
-            f"Columns: {', '.join(df.columns.tolist())}",
-        ]
-
-        # Add data types
-        if metadata.get("numeric_columns"):
-            summary_parts.append(
-                f"Numeric columns: {', '.join(metadata['numeric_columns'])}"
-            )
-        if metadata.get("categorical_columns"):
-            summary_parts.append(
-                f"Categorical columns: {', '.join(metadata['categorical_columns'])}"
-            )
-        if metadata.get("datetime_columns"):
-            summary_parts.append(
-                f"DateTime columns: {', '.join(metadata['datetime_columns'])}"
-            )
-
-        # Add statistical summary
-        if metadata.get("summary_stats"):
-            summary_parts.append("Statistical Summary:")
-            for col, stats in list(metadata["summary_stats"].items())[:3]:
-                summary_parts.append(
-                    f"  {col}: mean={stats.get('mean', 'N/A'):.2f}, std={stats.get('std', 'N/A'):.2f}"
-                )
-
-        # Add sample data
+        return "\n".join(chain(
+            self._summary_header(df, metadata),
+            self._summary_types(metadata),
+            self._summary_stats(df, metadata),
+            self._summary_sample(metadata),
+        ))
+
+    def _summary_header(self, df: pd.DataFrame, metadata: Dict[str, Any]) -> Iterator[str]:
+        """Yield the dataset name, shape and column list"""
+        # The upload metadata already records the shape and column names
+        columns = metadata.get("columns") or df.columns.tolist()
+        rows, column_count = metadata.get("shape") or df.shape
+        yield f"Dataset: {metadata.get('filename', 'Unknown')}"
+        yield f"Shape: {rows} rows, {column_count} columns"
+        yield f"Columns: {', '.join(map(str, columns))}"
+
+    def _summary_types(self, metadata: Dict[str, Any]) -> Iterator[str]:
+        """Yield the numeric, categorical and datetime column groups that are present"""
+        for label, key in (
+            ("Numeric", "numeric_columns"),
+            ("Categorical", "categorical_columns"),
+            ("DateTime", "datetime_columns"),
+        ):
+            if metadata.get(key):
+                yield f"{label} columns: {', '.join(map(str, metadata[key]))}"
+
+    def _summary_stats(self, df: pd.DataFrame, metadata: Dict[str, Any]) -> Iterator[str]:
+        """Yield mean and std for the first few numeric columns"""
+        # Computed here only when the upload metadata does not carry it already
+        summary_stats = metadata.get("summary_stats")
+        if not summary_stats:
+            numeric = df.select_dtypes("number").iloc[:, :SUMMARY_STATS_COLUMNS]
+            if numeric.shape[1]:
+                summary_stats = numeric.agg(["mean", "std"]).to_dict()
+        if summary_stats:
+            yield "Statistical Summary:"
+            for col, stats in islice(summary_stats.items(), SUMMARY_STATS_COLUMNS):
+                yield f"  {col}: mean={_format_stat(stats.get('mean'))}, std={_format_stat(stats.get('std'))}"
+
+    def _summary_sample(self, metadata: Dict[str, Any]) -> Iterator[str]:
+        """Yield the first sample rows as truncated JSON"""
         if metadata.get("sample_data"):
-            summary_parts.append("Sample data (first 3 rows):")
+            yield "Sample data (first 3 rows):"
             for i, row in enumerate(metadata["sample_data"][:3]):
-                summary_parts.append(f"  Row {i+1}: {str(row)[:100]}...")
-
-        return "\n".join(summary_parts)
+                # Only the first SAMPLE_ROW_CHARS characters are kept, so wide rows
+                # are serialized from a leading slice of their columns
+                if len(row) > SAMPLE_ROW_ITEMS:
+                    row = dict(islice(row.items(), SAMPLE_ROW_ITEMS))
+                row_json = orjson.dumps(
+                    row, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                ).decode()
+                yield f"  Row {i+1}: {row_json[:SAMPLE_ROW_CHARS]}..."
 
     def _create_analysis_prompt(self, data_summary: str) -> str:
         """Create a structured prompt for AI analysis"""
-        return f"""
-Analyze this dataset and suggest 3-5 specific visualizations that would reveal the most interesting patterns and insights:
-
-{data_summary}
-
-Please respond with a JSON array where each object represents a chart suggestion with these exact keys:
-- "title": A descriptive title for the chart
-- "chart_type": One of: "bar", "line", "pie", "scatter", "histogram", "box", "heatmap"
-- "parameters": An object with chart parameters like {{"x_axis": "column_name", "y_axis": "column_name", "aggregation": "sum"}}
-- "insight": A brief explanation of what this visualization would reveal
-- "priority": A number from 1-5 indicating importance (5 being most important)
-
-Focus on:
-1. Identifying relationships between variables
-2. Highlighting distributions and outliers
-3. Showing trends over time (if applicable)
-4. Comparing categories or groups
-5. Revealing correlations
-
-Ensure the suggested columns exist in the dataset and the chart types are appropriate for the data types.
-"""
+        return ANALYSIS_PROMPT_TEMPLATE.format(data_summary=data_summary)
 
     def _parse_ai_response(self, response_text: str) -> List[ChartSuggestion]:
         """Parse AI response and convert to ChartSuggestion objects"""
         try:
-            # Extract JSON from response
-            start_idx = response_text.find("[")
-            end_idx = response_text.rfind("]") + 1
-
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON array found in response")
-
-            json_str = response_text[start_idx:end_idx]
-            suggestions_data = json.loads(json_str)
+            # JSON mode guarantees a single object, so the reply parses as-is
+            suggestions_data = orjson.loads(response_text)
+            if isinstance(suggestions_data, dict):
+                suggestions_data = suggestions_data.get("suggestions", [])
 
             suggestions = []
             for item in suggestions_data:
                 try:
-                    chart_params = ChartParameters(**item.get("parameters", {}))
-                    suggestion = ChartSuggestion(
-                        title=item["title"],
-                        chart_type=ChartType(item["chart_type"]),
-                        parameters=chart_params,
-                        insight=item["insight"],
-                        priority=item.get("priority", 3),
-                    )
+                    # One validation pass builds the suggestion and its parameters
+                    suggestion = ChartSuggestion.model_validate({
+                        "parameters": {},
+                        "priority": 3,
+                        **item,
+                    })
                     suggestions.append(suggestion)
                 except Exception as e:
-                    logger.warning(f"Skipping invalid suggestion: {e}")
+                    logger.warning("Skipping invalid suggestion: %s", e)
                     continue
 
             return suggestions
 
         except Exception as e:
-            logger.error(f"Error parsing AI response: {e}")
+            logger.error("Error parsing AI response: %s", e)
             return []
 
 
@@ -181,43 +452,99 @@ Ensure the suggested columns exist in the dataset and the chart types are approp
         df: pd.DataFrame
     ) -> Dict[str, str]:
         """Generate AI insights for a specific chart"""
+        results = await self.generate_chart_insights_batch(
+            [(chart_type, parameters, chart_data, df)]
+        )
+        return results[0]
+
+    async def generate_chart_insights_batch(
+        self,
+        items: List[Tuple[ChartType, ChartParameters, Dict[str, Any], pd.DataFrame]],
+    ) -> List[Dict[str, str]]:
+        """Generate AI insights for several charts, up to CHART_INSIGHT_GROUP_SIZE per OpenAI request"""
+        contexts = [self._prepare_chart_context(*item) for item in items]
+        keys = [
+            hashlib.blake2b(f"{OPENAI_MODEL}\x1f{context}".encode(), digest_size=16).hexdigest()
+            for context in contexts
+        ]
+
+        # Charts whose context was already described are served from the cache
+        results: List[Optional[Dict[str, str]]] = [insight_cache.get(key) for key in keys]
+        # Identical charts in one batch are described once
+        misses = list({keys[i]: i for i, cached in enumerate(results) if cached is None}.values())
+        if not misses:
+            return [dict(result) for result in results]
+
+        # Each group of charts is one request; groups run concurrently
+        groups = [
+            misses[start:start + CHART_INSIGHT_GROUP_SIZE]
+            for start in range(0, len(misses), CHART_INSIGHT_GROUP_SIZE)
+        ]
+        described = await asyncio.gather(
+            *(self._describe_charts([contexts[i] for i in group]) for group in groups)
+        )
+        generated_by_key = {}
+        for group, insights in zip(groups, described):
+            for i, insight in zip(group, insights):
+                generated_by_key[keys[i]] = insight
+                if insight["insight"] is not None:
+                    insight_cache[keys[i]] = insight
+
+        return [
+            dict(result if result is not None else generated_by_key[key])
+            for result, key in zip(results, keys)
+        ]
+
+    async def _describe_charts(self, contexts: List[str]) -> List[Dict[str, str]]:
+        """Ask OpenAI for the insights of up to CHART_INSIGHT_GROUP_SIZE charts in one request"""
         try:
-            # Prepare chart context
-            chart_context = self._prepare_chart_context(
-                chart_type, parameters, chart_data, df
+            chart_contexts = "\n\n".join(
+                f"CHART {n}:\n{context}" for n, context in enumerate(contexts, 1)
             )
-            
-            # Create AI prompt for chart interpretation
-            prompt = self._create_chart_insight_prompt(chart_context)
-            
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            prompt = self._create_chart_insight_prompt(chart_contexts, len(contexts))
+
+            response_text = await self._complete(
+                model=OPENAI_MODEL,
                 messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a data analyst expert. Analyze the provided chart and data to generate meaningful insights."
-                    },
+                    CHART_INSIGHT_SYSTEM_MESSAGE,
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=500
+                max_tokens=CHART_INSIGHT_TOKENS_PER_CHART * len(contexts),
+                response_format={"type": "json_object"},
+            )
+
+            return await self._run_parser(
+                self._parse_chart_insights, response_text, len(contexts)
             )
-            
-            # Parse response
-            ai_response = response.choices[0].message.content
-            
-            return {
-                "insight": self._extract_insight(ai_response),
-                "interpretation": self._extract_interpretation(ai_response)
-            }
-            
+
         except Exception as e:
-            logger.error(f"Error generating chart insight: {e}")
-            return {
-                "insight": None,
-                "interpretation": None
-            }
+            logger.error("Error generating chart insight: %s", e)
+            return [{"insight": None, "interpretation": None} for _ in contexts]
+
+    def _parse_chart_insights(self, ai_response: str, count: int) -> List[Dict[str, str]]:
+        """Split a batched insight response back into one dict per chart"""
+        try:
+            charts = orjson.loads(ai_response)["charts"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            # Fall back to the plain "INSIGHT: ... / INTERPRETATION: ..." layout
+            if count == 1 and isinstance(ai_response, str):
+                labels = self._parse_labels(ai_response)
+                charts = [{
+                    "insight": labels.get("INSIGHT"),
+                    "interpretation": labels.get("INTERPRETATION"),
+                }]
+            else:
+                charts = []
+
+        results = []
+        for i in range(count):
+            chart = charts[i] if i < len(charts) and isinstance(charts[i], dict) else {}
+            results.append({
+                "insight": chart.get("insight"),
+                "interpretation": chart.get("interpretation"),
+            })
+        return results
 
     def _prepare_chart_context(self, chart_type, parameters, chart_data, df):
         """Prepare context about the chart for AI analysis"""
@@ -243,48 +570,15 @@ Ensure the suggested columns exist in the dataset and the chart types are approp
         
         return "\n".join(context_parts)
 
-    def _create_chart_insight_prompt(self, chart_context):
+    def _create_chart_insight_prompt(self, chart_contexts, count):
         """Create AI prompt for chart insight generation"""
-        return f"""
-Analyze this data visualization and provide insights:
-
-{chart_context}
-
-Please provide:
-1. INSIGHT: A brief, actionable insight about what this chart reveals (1-2 sentences)
-2. INTERPRETATION: A detailed explanation of the patterns, trends, or relationships shown (2-3 sentences)
-
-Focus on:
-- Key patterns or trends visible in the data
-- Notable outliers or anomalies
-- Business implications or actionable insights
-- Relationships between variables
-
-Format your response as:
-INSIGHT: [your insight here]
-INTERPRETATION: [your interpretation here]
-"""
-
-    def _extract_insight(self, ai_response):
-        """Extract insight from AI response"""
-        try:
-            lines = ai_response.split('\n')
-            for line in lines:
-                if line.startswith('INSIGHT:'):
-                    return line.replace('INSIGHT:', '').strip()
-            return None
-        except:
-            return None
-
-    def _extract_interpretation(self, ai_response):
-        """Extract interpretation from AI response"""
-        try:
-            lines = ai_response.split('\n')
-            for line in lines:
-                if line.startswith('INTERPRETATION:'):
-                    return line.replace('INTERPRETATION:', '').strip()
-            return None
-        except:
-            return None
-
-
+        return CHART_INSIGHT_PROMPT_TEMPLATE.format(
+            chart_contexts=chart_contexts, count=count
+        )
+
+    def _parse_labels(self, ai_response: str) -> Dict[str, str]:
+        """Extract the INSIGHT / INTERPRETATION lines from a plain-text reply in one pass"""
+        labels: Dict[str, str] = {}
+        for match in LABEL_PATTERN.finditer(ai_response):
+            labels.setdefault(match.group(1), match.group(2).strip())
+        return labels
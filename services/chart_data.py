@@ -1,90 +1,149 @@
 import logging
-from typing import Any, Dict
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import Any, Callable, ClassVar, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
+from cachetools import LRUCache
 
 from models import ChartParameters, ChartType
 from .file_processing import file_storage
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _chart_cache_weight(result: Dict[str, Any]) -> int:
+    """Size of a cached chart, counted in data points"""
+    return len(result["data"]) + 1
+
+
+# Generated charts keyed by (file_id, chart type, parameters JSON), bounded by
+# the total number of data points held
+chart_cache: LRUCache = LRUCache(
+    maxsize=int(os.getenv("CHART_CACHE_MAX_POINTS", "1000000")),
+    getsizeof=_chart_cache_weight,
+)
+_chart_cache_lock = threading.Lock()
+
+# Charts of one batch are generated in parallel; the NumPy/pandas kernels
+# release the GIL for most of their work
+_chart_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CHART_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="chart-data",
+)
+
+
 class ChartDataService:
     """Service for generating chart-specific data"""
 
+    # Scatter plots above this many points are downsampled (unless params.limit says otherwise)
+    SCATTER_MAX_POINTS = 5000
+    SCATTER_GRID_SIZE = 100
+
+    # Integer columns spanning fewer distinct values than this are histogrammed with np.bincount
+    HISTOGRAM_BINCOUNT_MAX_RANGE = 1 << 20
+    # Samples per block of the KDE kernel matrix, keeping it a few MB at most
+    KDE_CHUNK_SIZE = 8192
+    # Larger samples are binned onto a grid and convolved with the kernel via FFT
+    KDE_BINNED_MIN_SAMPLES = 10000
+    KDE_GRID_SIZE = 1024
+
     @staticmethod
     def get_chart_data(
         file_id: str, chart_type: ChartType, parameters: ChartParameters
     ) -> Dict[str, Any]:
         """Generate formatted data for specific chart type"""
-        if file_id not in file_storage:
+        if chart_type == ChartType.RIDGELINE:
+            # A ridgeline is the density chart with a subtype, so both share one
+            # cached KDE computation
+            density = ChartDataService.get_chart_data(file_id, ChartType.DENSITY, parameters)
+            return {
+                "data": density["data"],
+                "metadata": {**density["metadata"], "chart_subtype": "ridgeline"},
+            }
+
+        # Uploads never change, so a chart is a pure function of its request; the
+        # membership check keeps files deleted by any worker from being served
+        cache_key = (file_id, chart_type, parameters.model_dump_json(exclude_none=True))
+        with _chart_cache_lock:
+            cached = chart_cache.get(cache_key)
+        if cached is not None and file_id in file_storage:
+            return dict(cached)
+
+        entry = file_storage.get(file_id)
+        if entry is None:
             raise ValueError(f"File {file_id} not found")
 
-        df = file_storage[file_id]
+        df = entry["df"]
 
-        try:
-            if chart_type == ChartType.BAR:
-                return ChartDataService._generate_bar_data(df, parameters)
-            elif chart_type == ChartType.LINE:
-                return ChartDataService._generate_line_data(df, parameters)
-            elif chart_type == ChartType.PIE:
-                return ChartDataService._generate_pie_data(df, parameters)
-            elif chart_type == ChartType.SCATTER:
-                return ChartDataService._generate_scatter_data(df, parameters)
-            elif chart_type == ChartType.HISTOGRAM:
-                return ChartDataService._generate_histogram_data(df, parameters)
-            elif chart_type == ChartType.BOX:
-                return ChartDataService._generate_box_data(df, parameters)
-            elif chart_type == ChartType.AREA:
-                return ChartDataService._generate_area_data(df, parameters)
-            elif chart_type == ChartType.DONUT:
-                return ChartDataService._generate_donut_data(df, parameters)
-            elif chart_type == ChartType.VIOLIN:
-                return ChartDataService._generate_violin_data(df, parameters)
-            elif chart_type == ChartType.HEATMAP:
-                return ChartDataService._generate_heatmap_data(df, parameters)
-            elif chart_type == ChartType.BUBBLE:
-                return ChartDataService._generate_bubble_data(df, parameters)
-            elif chart_type == ChartType.RADAR:
-                return ChartDataService._generate_radar_data(df, parameters)
-            elif chart_type == ChartType.TREEMAP:
-                return ChartDataService._generate_treemap_data(df, parameters)
-            elif chart_type == ChartType.SUNBURST:
-                return ChartDataService._generate_sunburst_data(df, parameters)
-            elif chart_type == ChartType.DENSITY:
-                return ChartDataService._generate_density_data(df, parameters)
-            elif chart_type == ChartType.RIDGELINE:
-                return ChartDataService._generate_ridgeline_data(df, parameters)
-            elif chart_type == ChartType.CANDLESTICK:
-                return ChartDataService._generate_candlestick_data(df, parameters)
-            elif chart_type == ChartType.WATERFALL:
-                return ChartDataService._generate_waterfall_data(df, parameters)
-            elif chart_type == ChartType.GANTT:
-                return ChartDataService._generate_gantt_data(df, parameters)
-            elif chart_type == ChartType.SANKEY:
-                return ChartDataService._generate_sankey_data(df, parameters)
-            elif chart_type == ChartType.CHORD:
-                return ChartDataService._generate_chord_data(df, parameters)
-            elif chart_type == ChartType.FUNNEL:
-                return ChartDataService._generate_funnel_data(df, parameters)
-            elif chart_type == ChartType.STACKED_BAR:
-                return ChartDataService._generate_stacked_bar_data(df, parameters)
-            elif chart_type == ChartType.GROUPED_BAR:
-                return ChartDataService._generate_grouped_bar_data(df, parameters)
-            elif chart_type == ChartType.MULTI_LINE:
-                return ChartDataService._generate_multi_line_data(df, parameters)
-            elif chart_type == ChartType.STACKED_AREA:
-                return ChartDataService._generate_stacked_area_data(df, parameters)
-            else:
-                raise ValueError(f"Chart type {chart_type} not implemented")
+        handler = ChartDataService._DISPATCH.get(chart_type)
+        if handler is None:
+            raise ValueError(f"Chart type {chart_type} not implemented")
 
+        try:
+            result = handler(df, parameters)
         except Exception as e:
-            logger.error(f"Error generating chart data: {e}")
+            logger.error("Error generating chart data: %s", e)
             raise ValueError(f"Error generating chart data: {str(e)}")
 
+        # Charts too large for the whole cache are simply not kept
+        if _chart_cache_weight(result) <= chart_cache.maxsize:
+            with _chart_cache_lock:
+                chart_cache[cache_key] = result
+        return dict(result)
+
+    @staticmethod
+    def get_charts_batch(
+        file_id: str, charts: List[Tuple[ChartType, ChartParameters]]
+    ) -> List[Dict[str, Any]]:
+        """Generate several charts of one file in parallel, in request order"""
+        futures = [
+            _chart_executor.submit(ChartDataService.get_chart_data, file_id, chart_type, parameters)
+            for chart_type, parameters in charts
+        ]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def invalidate(file_id: str) -> None:
+        """Drop every cached chart of a file"""
+        with _chart_cache_lock:
+            for key in [key for key in chart_cache if key[0] == file_id]:
+                del chart_cache[key]
+
+    @staticmethod
+    def _drop_missing(data):
+        """dropna() that hands back the data itself, without copying, when nothing is missing"""
+        if isinstance(data, pd.Series):
+            has_missing = data.hasnans
+        else:
+            has_missing = data.isna().to_numpy().any()
+        return data.dropna() if has_missing else data
+
+    @staticmethod
+    def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Row dicts like df.to_dict("records"), built from whole-column tolist() conversions"""
+        columns = df.columns.tolist()
+        return [
+            dict(zip(columns, row))
+            for row in zip(*(df[col].tolist() for col in columns))
+        ]
+
+    @staticmethod
+    def _sorted_xy_records(df: pd.DataFrame, x_col: str, y_col: str) -> List[Dict[str, Any]]:
+        """Rows of (x, y) without nulls, sorted by x, gathered straight from the two columns"""
+        mask = (df[x_col].notna() & df[y_col].notna()).to_numpy()
+        x = df[x_col][mask]
+        y = df[y_col][mask]
+        # Datetime-like x columns usually arrive sorted already
+        if not x.is_monotonic_increasing:
+            order = x.array.argsort(kind="stable")
+            x = x.iloc[order]
+            y = y.iloc[order]
+        return [{x_col: x_val, y_col: y_val} for x_val, y_val in zip(x.tolist(), y.tolist())]
+
     @staticmethod
     def _generate_bar_data(df: pd.DataFrame, params: ChartParameters) -> Dict[str, Any]:
         """Generate data for bar charts"""
@@ -96,28 +155,39 @@ class ChartDataService:
             raise ValueError("x_axis is required for bar charts")
 
         if y_col:
-            # Aggregate y_col by x_col
-            if agg_func == "count":
-                data = df.groupby(x_col)[y_col].count().reset_index()
-            elif agg_func == "sum":
-                data = df.groupby(x_col)[y_col].sum().reset_index()
-            elif agg_func == "mean":
-                data = df.groupby(x_col)[y_col].mean().reset_index()
-            else:
-                data = df.groupby(x_col)[y_col].agg(agg_func).reset_index()
+            # Aggregate y_col by x_col in a single vectorized groupby
+            data = df.groupby(x_col, observed=True)[y_col].agg(agg_func).reset_index()
+            if params.limit:
+                if pd.api.types.is_numeric_dtype(data[y_col]):
+                    # Keep the largest groups, then restore key order for the bars
+                    data = (
+                        data.sort_values(y_col, ascending=False, kind="stable")
+                        .head(params.limit)
+                        .sort_index()
+                    )
+                else:
+                    # Text aggregates (min/max/first of a string column) keep the first groups
+                    data = data.head(params.limit)
+            chart_data = ChartDataService._to_records(data)
         else:
-            # Count occurrences of x_col
-            data = df[x_col].value_counts().reset_index()
-            data.columns = [x_col, "count"]
+            # Count occurrences of x_col (value_counts is already sorted descending);
+            # records come straight from the counts without a reset_index frame
+            counts = df[x_col].value_counts()
+            if params.limit:
+                counts = counts.iloc[: params.limit]
             y_col = "count"
+            chart_data = [
+                {x_col: label, y_col: count}
+                for label, count in zip(counts.index.tolist(), counts.tolist())
+            ]
 
         return {
-            "data": data.to_dict("records"),
+            "data": chart_data,
             "metadata": {
                 "x_column": x_col,
                 "y_column": y_col,
                 "aggregation": agg_func,
-                "total_points": len(data),
+                "total_points": len(chart_data),
             },
         }
 
@@ -138,18 +208,106 @@ class ChartDataService:
         if color_col and color_col in df.columns:
             cols.append(color_col)
 
-        data = df[cols].dropna()
+        data = ChartDataService._drop_missing(df[cols])
+        total_points = len(data)
+
+        # Downsample before building row dicts; charts can't render more points anyway
+        max_points = params.limit or ChartDataService.SCATTER_MAX_POINTS
+        if total_points > max_points:
+            data = ChartDataService._downsample_points(data, x_col, y_col, max_points)
 
         return {
-            "data": data.to_dict("records"),
+            "data": ChartDataService._to_records(data),
             "metadata": {
                 "x_column": x_col,
                 "y_column": y_col,
                 "color_column": color_col,
-                "total_points": len(data),
+                "total_points": total_points,
+                "returned_points": len(data),
+                "downsampled": len(data) < total_points,
             },
         }
 
+    @staticmethod
+    def _downsample_points(
+        data: pd.DataFrame, x_col: str, y_col: str, max_points: int
+    ) -> pd.DataFrame:
+        """Reduce points to at most max_points, keeping one point per cell of a 2-D grid first"""
+        if pd.api.types.is_numeric_dtype(data[x_col]) and pd.api.types.is_numeric_dtype(data[y_col]):
+            grid = ChartDataService.SCATTER_GRID_SIZE
+            cells = np.zeros(len(data), dtype=np.int64)
+            for col in (x_col, y_col):
+                values = data[col].to_numpy(dtype=np.float64)
+                edges = np.linspace(values.min(), values.max(), grid + 1)
+                cells = cells * (grid + 2) + np.digitize(values, edges)
+            # First point in each occupied cell, in original row order
+            _, first = np.unique(cells, return_index=True)
+            data = data.iloc[np.sort(first)]
+
+        if len(data) > max_points:
+            # sort_index keeps the original row order
+            data = data.sample(n=max_points, random_state=0).sort_index()
+        return data
+
+    @staticmethod
+    def _split_by_group(keys: pd.Series, values: pd.Series) -> List[Any]:
+        """Split the non-null values into (group, array) pairs, ordered by group like groupby"""
+        mask = (values.notna() & keys.notna()).to_numpy()
+        codes, groups = pd.factorize(keys[mask], sort=True)
+        order = np.argsort(codes, kind="stable")
+        sorted_values = values[mask].to_numpy()[order]
+        bounds = np.searchsorted(codes[order], np.arange(len(groups) + 1))
+        return [
+            (group, sorted_values[start:end])
+            for group, start, end in zip(groups, bounds[:-1], bounds[1:])
+            if end > start
+        ]
+
+    @staticmethod
+    def _gaussian_kde(values: np.ndarray, x_points: np.ndarray, bandwidth: float) -> List[float]:
+        """Evaluate a Gaussian kernel density estimate of values at x_points"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) >= ChartDataService.KDE_BINNED_MIN_SAMPLES:
+            lo, hi = values.min(), values.max()
+            step = (hi - lo) / (ChartDataService.KDE_GRID_SIZE - 1)
+            # Binning is only accurate when the kernel spans several grid cells
+            if step > 0 and bandwidth >= 4 * step:
+                return ChartDataService._binned_gaussian_kde(
+                    values, x_points, bandwidth, lo, step
+                )
+
+        density = np.zeros(len(x_points))
+        for start in range(0, len(values), ChartDataService.KDE_CHUNK_SIZE):
+            chunk = values[start:start + ChartDataService.KDE_CHUNK_SIZE]
+            u = (x_points[:, None] - chunk[None, :]) / bandwidth
+            density += np.exp(-0.5 * u * u).sum(axis=1)
+        density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+        return density.tolist()
+
+    @staticmethod
+    def _binned_gaussian_kde(
+        values: np.ndarray, x_points: np.ndarray, bandwidth: float, lo: float, step: float
+    ) -> List[float]:
+        """Approximate a Gaussian KDE by linear binning onto a grid and an FFT convolution"""
+        grid = ChartDataService.KDE_GRID_SIZE
+        position = (values - lo) / step
+        left = np.minimum(position.astype(np.int64), grid - 2)
+        weight = position - left
+        counts = (
+            np.bincount(left, weights=1 - weight, minlength=grid)
+            + np.bincount(left + 1, weights=weight, minlength=grid)
+        )
+
+        # Kernel sampled at every grid offset, then a linear (zero-padded) convolution
+        offsets = np.arange(-(grid - 1), grid) * (step / bandwidth)
+        kernel = np.exp(-0.5 * offsets * offsets)
+        size = 1 << int(3 * grid - 2).bit_length()
+        smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+        density = np.clip(smoothed[grid - 1:2 * grid - 1], 0, None)
+        density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+
+        return np.interp(x_points, lo + step * np.arange(grid), density).tolist()
+
     @staticmethod
     def _generate_histogram_data(
         df: pd.DataFrame, params: ChartParameters
@@ -161,14 +319,40 @@ class ChartDataService:
         if not x_col:
             raise ValueError("x_axis is required for histograms")
 
-        data = df[x_col].dropna()
-        hist, bin_edges = np.histogram(data, bins=bins)
+        data = ChartDataService._drop_missing(df[x_col])
+        values = data.to_numpy()
 
-        # Create bin labels
-        bin_labels = [f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}" for i in range(len(hist))]
+        if len(values) == 0:
+            # Empty or all-null column: zero counts over np.histogram's default [0, 1] range
+            min_value = max_value = np.nan
+            hist, bin_edges = np.histogram(values, bins=bins)
+        else:
+            # One min/max pass, shared by np.histogram (via range) and the metadata
+            min_value, max_value = values.min(), values.max()
+
+            if (
+                pd.api.types.is_integer_dtype(values.dtype)
+                and int(max_value) - int(min_value) < ChartDataService.HISTOGRAM_BINCOUNT_MAX_RANGE
+            ):
+                # Count each distinct integer once, then bin those counts; assigning
+                # bins on the distinct values keeps np.histogram's exact edge rules
+                counts = np.bincount(np.subtract(values, min_value, dtype=np.int64))
+                hist, bin_edges = np.histogram(
+                    np.arange(int(min_value), int(max_value) + 1),
+                    bins=bins,
+                    range=(min_value, max_value),
+                    weights=counts,
+                )
+                hist = hist.astype(np.int64)
+            else:
+                hist, bin_edges = np.histogram(values, bins=bins, range=(min_value, max_value))
+
+        # Create bin labels, formatting each shared edge once
+        edge_labels = [f"{edge:.2f}" for edge in bin_edges.tolist()]
 
         chart_data = [
-            {"bin": label, "count": int(count)} for label, count in zip(bin_labels, hist)
+            {"bin": f"{lower}-{upper}", "count": count}
+            for lower, upper, count in zip(edge_labels, edge_labels[1:], hist.tolist())
         ]
 
         return {
@@ -177,8 +361,8 @@ class ChartDataService:
                 "column": x_col,
                 "bins": bins,
                 "total_values": len(data),
-                "min_value": float(data.min()),
-                "max_value": float(data.max()),
+                "min_value": float(min_value),
+                "max_value": float(max_value),
             },
         }
 
@@ -191,8 +375,10 @@ class ChartDataService:
             raise ValueError("x_axis is required for pie charts")
 
         data = df[x_col].value_counts()
+        # tolist() unboxes labels and counts in one pass each instead of per item
         chart_data = [
-            {"label": str(label), "value": int(value)} for label, value in data.items()
+            {"label": str(label), "value": value}
+            for label, value in zip(data.index.tolist(), data.tolist())
         ]
 
         return {
@@ -213,14 +399,14 @@ class ChartDataService:
         if not x_col or not y_col:
             raise ValueError("Both x_axis and y_axis are required for line charts")
 
-        data = df[[x_col, y_col]].dropna().sort_values(x_col)
+        chart_data = ChartDataService._sorted_xy_records(df, x_col, y_col)
 
         return {
-            "data": data.to_dict("records"),
+            "data": chart_data,
             "metadata": {
                 "x_column": x_col,
                 "y_column": y_col,
-                "total_points": len(data),
+                "total_points": len(chart_data),
             },
         }
 
@@ -234,15 +420,14 @@ class ChartDataService:
             raise ValueError("y_axis is required for box plots")
 
         if group_col:
-            # Grouped box plot
-            groups = df.groupby(group_col)[y_col].apply(list).to_dict()
+            # Grouped box plot; one tolist() per group instead of apply(list) boxing row by row
             chart_data = [
-                {"group": str(group), "values": values}
-                for group, values in groups.items()
+                {"group": str(group), "values": values.tolist()}
+                for group, values in df.groupby(group_col, observed=True)[y_col]
             ]
         else:
             # Single box plot
-            values = df[y_col].dropna().tolist()
+            values = ChartDataService._drop_missing(df[y_col]).tolist()
             chart_data = [{"group": y_col, "values": values}]
 
         return {
@@ -270,23 +455,27 @@ class ChartDataService:
             # Stacked area chart
             pivot_data = df.pivot_table(
                 values=y_col, index=x_col, columns=stack_by, 
-                aggfunc=params.aggregation or "sum", fill_value=0
+                aggfunc=params.aggregation or "sum", fill_value=0, observed=True
             )
             
+            # Positional access on one array instead of a .loc lookup per cell; cumsum
+            # accumulates left to right in float64 like the scalar running total did
+            values = pivot_data.to_numpy()
+            cumulative = np.cumsum(values, axis=1, dtype=np.float64)
+            keys = [(f"{col}_value", f"{col}_cumulative") for col in pivot_data.columns]
+
             chart_data = []
-            for idx in pivot_data.index:
+            for idx, row_values, row_cumulative in zip(
+                pivot_data.index, values.tolist(), cumulative.tolist()
+            ):
                 row_data = {"x": str(idx)}
-                cumulative = 0
-                for col in pivot_data.columns:
-                    value = pivot_data.loc[idx, col]
-                    cumulative += value
-                    row_data[f"{col}_value"] = float(value)
-                    row_data[f"{col}_cumulative"] = float(cumulative)
+                for (value_key, cumulative_key), value, total in zip(keys, row_values, row_cumulative):
+                    row_data[value_key] = float(value)
+                    row_data[cumulative_key] = float(total)
                 chart_data.append(row_data)
         else:
             # Simple area chart
-            data = df[[x_col, y_col]].dropna().sort_values(x_col)
-            chart_data = data.to_dict("records")
+            chart_data = ChartDataService._sorted_xy_records(df, x_col, y_col)
 
         return {
             "data": chart_data,
@@ -319,23 +508,18 @@ class ChartDataService:
 
         if group_col:
             # Grouped violin plot
-            groups = df.groupby(group_col)[y_col].apply(list).to_dict()
             chart_data = []
             
-            for group, values in groups.items():
-                values = [v for v in values if pd.notna(v)]
+            for group, values_array in ChartDataService._split_by_group(df[group_col], df[y_col]):
+                values = values_array.tolist()
                 if values:
                     # Calculate density estimation points
-                    values_array = np.array(values)
                     min_val, max_val = values_array.min(), values_array.max()
                     x_points = np.linspace(min_val, max_val, 50)
                     
                     # Simple kernel density estimation
                     bandwidth = params.bandwidth or (max_val - min_val) / 20
-                    density = []
-                    for x in x_points:
-                        kde_sum = sum(np.exp(-0.5 * ((x - v) / bandwidth) ** 2) for v in values)
-                        density.append(kde_sum / (len(values) * bandwidth * np.sqrt(2 * np.pi)))
+                    density = ChartDataService._gaussian_kde(values_array, x_points, bandwidth)
                     
                     chart_data.append({
                         "group": str(group),
@@ -352,16 +536,13 @@ class ChartDataService:
                     })
         else:
             # Single violin plot
-            values = df[y_col].dropna().tolist()
+            values = ChartDataService._drop_missing(df[y_col]).tolist()
             values_array = np.array(values)
             min_val, max_val = values_array.min(), values_array.max()
             x_points = np.linspace(min_val, max_val, 50)
             
             bandwidth = params.bandwidth or (max_val - min_val) / 20
-            density = []
-            for x in x_points:
-                kde_sum = sum(np.exp(-0.5 * ((x - v) / bandwidth) ** 2) for v in values)
-                density.append(kde_sum / (len(values) * bandwidth * np.sqrt(2 * np.pi)))
+            density = ChartDataService._gaussian_kde(values_array, x_points, bandwidth)
             
             chart_data = [{
                 "group": y_col,
@@ -401,25 +582,31 @@ class ChartDataService:
             # Pivot table with values
             heatmap_data = df.pivot_table(
                 values=value_col, index=y_col, columns=x_col,
-                aggfunc=params.aggregation or "mean", fill_value=0
+                aggfunc=params.aggregation or "mean", fill_value=0, observed=True
             )
         else:
             # Count-based heatmap
             heatmap_data = df.pivot_table(
-                index=y_col, columns=x_col, aggfunc='size', fill_value=0
+                index=y_col, columns=x_col, aggfunc='size', fill_value=0, observed=True
             )
 
-        # Convert to list of dictionaries
-        chart_data = []
-        for y_idx, y_val in enumerate(heatmap_data.index):
-            for x_idx, x_val in enumerate(heatmap_data.columns):
-                chart_data.append({
-                    "x": str(x_val),
-                    "y": str(y_val),
-                    "value": float(heatmap_data.iloc[y_idx, x_idx]),
-                    "x_index": x_idx,
-                    "y_index": y_idx
-                })
+        # Convert to list of dictionaries, one per cell in row-major order
+        x_categories = [str(x) for x in heatmap_data.columns]
+        y_categories = [str(y) for y in heatmap_data.index]
+        values = heatmap_data.to_numpy(dtype=np.float64)
+        chart_data = [
+            {
+                "x": x_categories[x_idx],
+                "y": y_categories[y_idx],
+                "value": value,
+                "x_index": x_idx,
+                "y_index": y_idx
+            }
+            for (y_idx, x_idx), value in zip(
+                product(range(len(y_categories)), range(len(x_categories))),
+                values.ravel().tolist(),
+            )
+        ]
 
         return {
             "data": chart_data,
@@ -427,10 +614,10 @@ class ChartDataService:
                 "x_column": x_col,
                 "y_column": y_col,
                 "value_column": value_col,
-                "x_categories": [str(x) for x in heatmap_data.columns],
-                "y_categories": [str(y) for y in heatmap_data.index],
-                "min_value": float(heatmap_data.min().min()),
-                "max_value": float(heatmap_data.max().max())
+                "x_categories": x_categories,
+                "y_categories": y_categories,
+                "min_value": float(np.nanmin(values)) if values.size else float("nan"),
+                "max_value": float(np.nanmax(values)) if values.size else float("nan")
             },
         }
 
@@ -447,27 +634,31 @@ class ChartDataService:
 
         # Select relevant columns
         cols = [x_col, y_col, size_col]
-        if color_col and color_col in df.columns:
+        has_color = bool(color_col) and color_col in df.columns
+        if has_color:
             cols.append(color_col)
 
-        data = df[cols].dropna()
+        # The same column may drive several encodings; select it once
+        data = ChartDataService._drop_missing(df[list(dict.fromkeys(cols))])
 
-        # Normalize bubble sizes for better visualization
-        size_values = data[size_col]
-        min_size, max_size = size_values.min(), size_values.max()
-        normalized_sizes = 10 + 40 * (size_values - min_size) / (max_size - min_size) if max_size > min_size else [25] * len(size_values)
+        # Normalize bubble sizes for better visualization (in float64, so narrow
+        # integer columns cannot overflow)
+        size_values = data[size_col].to_numpy(dtype=np.float64)
+        min_size, max_size = data[size_col].min(), data[size_col].max()
+        if max_size > min_size:
+            normalized_sizes = 10 + 40 * (size_values - float(min_size)) / (float(max_size) - float(min_size))
+        else:
+            normalized_sizes = np.full(len(size_values), 25.0)
 
-        chart_data = []
-        for idx, row in data.iterrows():
-            bubble = {
-                "x": float(row[x_col]),
-                "y": float(row[y_col]),
-                "size": float(normalized_sizes.iloc[idx] if hasattr(normalized_sizes, 'iloc') else normalized_sizes[idx]),
-                "original_size": float(row[size_col])
-            }
-            if color_col:
-                bubble["color"] = str(row[color_col])
-            chart_data.append(bubble)
+        columns = {
+            "x": data[x_col].to_numpy(dtype=np.float64).tolist(),
+            "y": data[y_col].to_numpy(dtype=np.float64).tolist(),
+            "size": normalized_sizes.tolist(),
+            "original_size": size_values.tolist(),
+        }
+        if has_color:
+            columns["color"] = data[color_col].astype(str).tolist()
+        chart_data = [dict(zip(columns, row)) for row in zip(*columns.values())]
 
         return {
             "data": chart_data,
@@ -499,58 +690,28 @@ class ChartDataService:
         else:
             numeric_cols = numeric_cols[:8]  # Max 8 dimensions for readability
 
+        aggregation = params.aggregation if params.aggregation in ("sum", "median") else "mean"
+
         if group_col and group_col in df.columns:
-            # Multiple series radar chart
-            chart_data = []
-            for group_value in df[group_col].unique():
-                if pd.isna(group_value):
-                    continue
-                    
-                group_data = df[df[group_col] == group_value]
-                series_data = {
-                    "group": str(group_value),
-                    "values": []
-                }
-                
-                for col in numeric_cols:
-                    if params.aggregation == "mean":
-                        value = group_data[col].mean()
-                    elif params.aggregation == "sum":
-                        value = group_data[col].sum()
-                    elif params.aggregation == "median":
-                        value = group_data[col].median()
-                    else:
-                        value = group_data[col].mean()
-                    
-                    series_data["values"].append({
-                        "axis": col,
-                        "value": float(value) if pd.notna(value) else 0
-                    })
-                
-                chart_data.append(series_data)
+            # Multiple series radar chart, groups in order of first appearance
+            aggregated = df.groupby(group_col, observed=True, sort=False)[numeric_cols].agg(aggregation)
+            groups = [str(group) for group in aggregated.index]
+            rows = aggregated.to_numpy(dtype=np.float64).tolist()
         else:
             # Single series radar chart
-            series_data = {
-                "group": "Data",
-                "values": []
+            groups = ["Data"]
+            rows = [df[numeric_cols].agg(aggregation).to_numpy(dtype=np.float64).tolist()]
+
+        chart_data = [
+            {
+                "group": group,
+                "values": [
+                    {"axis": col, "value": value if pd.notna(value) else 0}
+                    for col, value in zip(numeric_cols, row)
+                ]
             }
-            
-            for col in numeric_cols:
-                if params.aggregation == "mean":
-                    value = df[col].mean()
-                elif params.aggregation == "sum":
-                    value = df[col].sum()
-                elif params.aggregation == "median":
-                    value = df[col].median()
-                else:
-                    value = df[col].mean()
-                
-                series_data["values"].append({
-                    "axis": col,
-                    "value": float(value) if pd.notna(value) else 0
-                })
-            
-            chart_data = [series_data]
+            for group, row in zip(groups, rows)
+        ]
 
         return {
             "data": chart_data,
@@ -562,6 +723,18 @@ class ChartDataService:
             },
         }
 
+    @staticmethod
+    def _treemap_leaves(names: List[str], values: np.ndarray, total_value: float) -> List[Dict[str, Any]]:
+        """Treemap nodes with each value's share of total_value"""
+        if total_value > 0:
+            percentages = (values / total_value * 100).tolist()
+        else:
+            percentages = [0] * len(names)
+        return [
+            {"name": name, "value": value, "percentage": percentage}
+            for name, value, percentage in zip(names, values.tolist(), percentages)
+        ]
+
     @staticmethod
     def _generate_treemap_data(df: pd.DataFrame, params: ChartParameters) -> Dict[str, Any]:
         """Generate data for treemap charts"""
@@ -574,41 +747,33 @@ class ChartDataService:
 
         if subcategory_col and subcategory_col in df.columns:
             # Hierarchical treemap
-            grouped = df.groupby([category_col, subcategory_col])[value_col].agg(params.aggregation or "sum").reset_index()
+            grouped = df.groupby([category_col, subcategory_col], observed=True)[value_col].agg(params.aggregation or "sum").reset_index()
             
+            # grouped is sorted by category, so each category is one contiguous run
+            categories = grouped[category_col].to_numpy()
+            names = grouped[subcategory_col].astype(str).tolist()
+            values = grouped[value_col].to_numpy(dtype=np.float64)
+            bounds = np.flatnonzero(categories[1:] != categories[:-1]) + 1
+            starts = np.concatenate(([0], bounds)) if len(categories) else []
+            ends = np.concatenate((bounds, [len(categories)])) if len(categories) else []
+
             chart_data = []
-            for category in grouped[category_col].unique():
-                if pd.isna(category):
-                    continue
-                    
-                category_data = grouped[grouped[category_col] == category]
-                total_value = category_data[value_col].sum()
-                
-                children = []
-                for _, row in category_data.iterrows():
-                    children.append({
-                        "name": str(row[subcategory_col]),
-                        "value": float(row[value_col]),
-                        "percentage": float(row[value_col] / total_value * 100) if total_value > 0 else 0
-                    })
-                
+            for start, end in zip(starts, ends):
+                total_value = values[start:end].sum()
                 chart_data.append({
-                    "name": str(category),
+                    "name": str(categories[start]),
                     "value": float(total_value),
-                    "children": children
+                    "children": ChartDataService._treemap_leaves(
+                        names[start:end], values[start:end], total_value
+                    )
                 })
         else:
             # Simple treemap
-            grouped = df.groupby(category_col)[value_col].agg(params.aggregation or "sum").reset_index()
-            total_value = grouped[value_col].sum()
-            
-            chart_data = []
-            for _, row in grouped.iterrows():
-                chart_data.append({
-                    "name": str(row[category_col]),
-                    "value": float(row[value_col]),
-                    "percentage": float(row[value_col] / total_value * 100) if total_value > 0 else 0
-                })
+            grouped = df.groupby(category_col, observed=True)[value_col].agg(params.aggregation or "sum").reset_index()
+            values = grouped[value_col].to_numpy(dtype=np.float64)
+            chart_data = ChartDataService._treemap_leaves(
+                grouped[category_col].astype(str).tolist(), values, values.sum()
+            )
 
         return {
             "data": chart_data,
@@ -641,21 +806,20 @@ class ChartDataService:
         if group_col and group_col in df.columns:
             # Multiple density curves
             chart_data = []
-            for group_value in df[group_col].unique():
-                if pd.isna(group_value):
-                    continue
-                    
-                group_data = df[df[group_col] == group_value][x_col].dropna()
+            # Partition only the x column, in order of first appearance, instead of
+            # filtering every column of the frame once per group
+            grouped = df[x_col].groupby(df[group_col], sort=False, observed=True)
+            for group_value, group_data in grouped:
+                group_data = ChartDataService._drop_missing(group_data)
                 if len(group_data) == 0:
                     continue
                     
                 min_val, max_val = group_data.min(), group_data.max()
                 x_points = np.linspace(min_val, max_val, 100)
                 
-                density = []
-                for x in x_points:
-                    kde_sum = sum(np.exp(-0.5 * ((x - v) / bandwidth) ** 2) for v in group_data)
-                    density.append(kde_sum / (len(group_data) * bandwidth * np.sqrt(2 * np.pi)))
+                density = ChartDataService._gaussian_kde(
+                    group_data.to_numpy(), x_points, bandwidth
+                )
                 
                 chart_data.append({
                     "group": str(group_value),
@@ -664,14 +828,11 @@ class ChartDataService:
                 })
         else:
             # Single density curve
-            data = df[x_col].dropna()
+            data = ChartDataService._drop_missing(df[x_col])
             min_val, max_val = data.min(), data.max()
             x_points = np.linspace(min_val, max_val, 100)
             
-            density = []
-            for x in x_points:
-                kde_sum = sum(np.exp(-0.5 * ((x - v) / bandwidth) ** 2) for v in data)
-                density.append(kde_sum / (len(data) * bandwidth * np.sqrt(2 * np.pi)))
+            density = ChartDataService._gaussian_kde(data.to_numpy(), x_points, bandwidth)
             
             chart_data = [{
                 "group": x_col,
@@ -692,14 +853,6 @@ class ChartDataService:
     # ===== PLACEHOLDER METHODS FOR COMPLEX CHARTS =====
     # These would require more sophisticated implementations
 
-    @staticmethod
-    def _generate_ridgeline_data(df: pd.DataFrame, params: ChartParameters) -> Dict[str, Any]:
-        """Generate data for ridgeline plots (multiple density plots stacked)"""
-        # Simplified implementation - would need more sophisticated layout
-        density_data = ChartDataService._generate_density_data(df, params)
-        density_data["metadata"]["chart_subtype"] = "ridgeline"
-        return density_data
-
     @staticmethod
     def _generate_candlestick_data(df: pd.DataFrame, params: ChartParameters) -> Dict[str, Any]:
         """Generate data for candlestick charts (OHLC financial data)"""
@@ -725,20 +878,21 @@ class ChartDataService:
             raise ValueError("Both x_axis and y_axis are required for waterfall charts")
         
         # Simple waterfall implementation
-        data = df[[category_col, value_col]].dropna()
-        cumulative = 0
-        chart_data = []
-        
-        for _, row in data.iterrows():
-            value = float(row[value_col])
-            chart_data.append({
-                "category": str(row[category_col]),
-                "value": value,
-                "cumulative": cumulative + value,
-                "start": cumulative,
-                "end": cumulative + value
-            })
-            cumulative += value
+        data = ChartDataService._drop_missing(df[[category_col, value_col]])
+        values = data[value_col].to_numpy(dtype=np.float64)
+        ends = np.cumsum(values)
+        starts = np.concatenate(([0.0], ends[:-1]))
+        cumulative = float(ends[-1]) if len(ends) else 0.0
+
+        chart_data = [
+            {"category": category, "value": value, "cumulative": end, "start": start, "end": end}
+            for category, value, start, end in zip(
+                data[category_col].astype(str).tolist(),
+                values.tolist(),
+                starts.tolist(),
+                ends.tolist(),
+            )
+        ]
         
         return {
             "data": chart_data,
@@ -787,21 +941,24 @@ class ChartDataService:
             raise ValueError("Both x_axis (stage) and y_axis (value) are required for funnel charts")
         
         # Aggregate data by stage
-        data = df.groupby(stage_col)[value_col].agg(params.aggregation or "sum").reset_index()
+        data = df.groupby(stage_col, observed=True)[value_col].agg(params.aggregation or "sum").reset_index()
         data = data.sort_values(value_col, ascending=False)
         
-        total_value = data[value_col].sum()
-        chart_data = []
-        
-        for idx, row in data.iterrows():
-            value = float(row[value_col])
-            chart_data.append({
-                "stage": str(row[stage_col]),
-                "value": value,
-                "percentage": (value / total_value * 100) if total_value > 0 else 0,
-                "order": idx
-            })
-        
+        values = data[value_col].to_numpy(dtype=np.float64)
+        total_value = values.sum()
+        if total_value > 0:
+            percentages = (values / total_value * 100).tolist()
+        else:
+            percentages = [0] * len(values)
+
+        # "order" keeps the stage's position before sorting by value
+        chart_data = [
+            {"stage": stage, "value": value, "percentage": percentage, "order": order}
+            for stage, value, percentage, order in zip(
+                data[stage_col].astype(str).tolist(), values.tolist(), percentages, data.index.tolist()
+            )
+        ]
+
         return {
             "data": chart_data,
             "metadata": {
@@ -824,27 +981,38 @@ class ChartDataService:
         if not x_col or not y_col or not stack_col:
             raise ValueError("x_axis, y_axis, and stack_by are required for stacked bar charts")
         
-        # Create pivot table
-        pivot_data = df.pivot_table(
-            values=y_col, index=x_col, columns=stack_col,
-            aggfunc=params.aggregation or "sum", fill_value=0
+        # Aggregate the long form and reshape it, as pivot_table does internally but without
+        # its extra passes; dropping NaN aggregates first keeps pivot_table's dropna/fill_value result
+        pivot_data = (
+            df.groupby([x_col, stack_col], observed=True)[y_col]
+            .agg(params.aggregation or "sum")
+            .dropna()
+            .unstack(fill_value=0)
         )
         
+        # Running totals across each row give every segment's end; its start is the previous end
+        values = pivot_data.to_numpy(dtype=np.float64)
+        ends = np.cumsum(values, axis=1)
+        starts = np.zeros_like(ends)
+        starts[:, 1:] = ends[:, :-1]
+        totals = ends[:, -1] if values.shape[1] else np.zeros(len(values))
+        keys = [
+            (f"{stack_value}_value", f"{stack_value}_start", f"{stack_value}_end")
+            for stack_value in pivot_data.columns
+        ]
+
         chart_data = []
-        for category in pivot_data.index:
+        for category, row_values, row_starts, row_ends, total in zip(
+            pivot_data.index, values.tolist(), starts.tolist(), ends.tolist(), totals.tolist()
+        ):
             row_data = {"category": str(category)}
-            cumulative = 0
-            
-            for stack_value in pivot_data.columns:
-                value = float(pivot_data.loc[category, stack_value])
-                row_data[f"{stack_value}_value"] = value
-                row_data[f"{stack_value}_start"] = cumulative
-                row_data[f"{stack_value}_end"] = cumulative + value
-                cumulative += value
-            
-            row_data["total"] = cumulative
+            for (value_key, start_key, end_key), value, start, end in zip(keys, row_values, row_starts, row_ends):
+                row_data[value_key] = value
+                row_data[start_key] = start
+                row_data[end_key] = end
+            row_data["total"] = total
             chart_data.append(row_data)
-        
+
         return {
             "data": chart_data,
             "metadata": {
@@ -874,19 +1042,18 @@ class ChartDataService:
         if not x_col or not y_col or not group_col:
             raise ValueError("x_axis, y_axis, and group_by are required for multi-line charts")
         
-        chart_data = []
-        for group_value in df[group_col].unique():
-            if pd.isna(group_value):
-                continue
-                
-            group_data = df[df[group_col] == group_value][[x_col, y_col]].dropna().sort_values(x_col)
-            
-            line_data = {
+        # One hash partition instead of re-filtering the frame for every series;
+        # sort=False keeps series in order of first appearance
+        columns = list(dict.fromkeys([group_col, x_col, y_col]))
+        grouped = df[columns].groupby(group_col, sort=False, observed=True)
+        chart_data = [
+            {
                 "series": str(group_value),
-                "points": group_data.to_dict("records")
+                "points": ChartDataService._sorted_xy_records(group_data, x_col, y_col)
             }
-            chart_data.append(line_data)
-        
+            for group_value, group_data in grouped
+        ]
+
         return {
             "data": chart_data,
             "metadata": {
@@ -905,3 +1072,33 @@ class ChartDataService:
         area_data["metadata"]["chart_subtype"] = "stacked"
         return area_data
 
+    # Chart type -> generator, built once when the class body executes
+    _DISPATCH: ClassVar[
+        Dict[ChartType, Callable[[pd.DataFrame, ChartParameters], Dict[str, Any]]]
+    ] = {
+        ChartType.BAR: _generate_bar_data.__func__,
+        ChartType.LINE: _generate_line_data.__func__,
+        ChartType.PIE: _generate_pie_data.__func__,
+        ChartType.SCATTER: _generate_scatter_data.__func__,
+        ChartType.HISTOGRAM: _generate_histogram_data.__func__,
+        ChartType.BOX: _generate_box_data.__func__,
+        ChartType.AREA: _generate_area_data.__func__,
+        ChartType.DONUT: _generate_donut_data.__func__,
+        ChartType.VIOLIN: _generate_violin_data.__func__,
+        ChartType.HEATMAP: _generate_heatmap_data.__func__,
+        ChartType.BUBBLE: _generate_bubble_data.__func__,
+        ChartType.RADAR: _generate_radar_data.__func__,
+        ChartType.TREEMAP: _generate_treemap_data.__func__,
+        ChartType.SUNBURST: _generate_sunburst_data.__func__,
+        ChartType.DENSITY: _generate_density_data.__func__,
+        ChartType.CANDLESTICK: _generate_candlestick_data.__func__,
+        ChartType.WATERFALL: _generate_waterfall_data.__func__,
+        ChartType.GANTT: _generate_gantt_data.__func__,
+        ChartType.SANKEY: _generate_sankey_data.__func__,
+        ChartType.CHORD: _generate_chord_data.__func__,
+        ChartType.FUNNEL: _generate_funnel_data.__func__,
+        ChartType.STACKED_BAR: _generate_stacked_bar_data.__func__,
+        ChartType.GROUPED_BAR: _generate_grouped_bar_data.__func__,
+        ChartType.MULTI_LINE: _generate_multi_line_data.__func__,
+        ChartType.STACKED_AREA: _generate_stacked_area_data.__func__,
+    }
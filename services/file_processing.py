@@ -1,19 +1,233 @@
-import io
+import asyncio
+import contextlib
 import logging
 import os
+import tempfile
+import threading
+import time
 import uuid
-from typing import Any, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, ClassVar, Dict, Optional
 
 import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-# In-memory storage for demo purposes - use Redis/Database in production
-file_storage: Dict[str, pd.DataFrame] = {}
+class FileCache:
+    """Bounded LRU of uploaded DataFrames backed by Parquet files on disk.
+
+    Every upload is written once to ``{cache_dir}/{file_id}.parquet`` together
+    with its metadata and data overview; the in-memory LRU is bounded by entry count and total
+    DataFrame bytes, and evicted entries are reloaded from the memory-mapped
+    Parquet file on demand. Object columns Arrow cannot type (mixed values)
+    are stored as text in the Parquet copy. Workers that share ``cache_dir`` can serve each other's
+    uploads, and the Parquet file is the source of truth: deleting it
+    invalidates the entry in every worker. Parquet files older than
+    ``disk_ttl`` seconds, or the oldest ones beyond ``max_disk_bytes``, are
+    swept on startup and after every upload; their uploads are then unknown.
+    """
+
+    METADATA_KEY = b"analisis_metadata"
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int,
+        max_bytes: int,
+        disk_ttl: float,
+        max_disk_bytes: int,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_ttl = disk_ttl
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sweep()
+
+    def _path(self, file_id: str) -> Optional[str]:
+        """Return the Parquet path for a file ID, or None if the ID is malformed"""
+        try:
+            if str(uuid.UUID(file_id)) != file_id:
+                return None
+        except (ValueError, TypeError, AttributeError):
+            return None
+        return os.path.join(self.cache_dir, f"{file_id}.parquet")
+
+    def put(
+        self,
+        file_id: str,
+        df: pd.DataFrame,
+        metadata: Dict[str, Any],
+        overview: Dict[str, Any],
+    ) -> None:
+        """Persist a DataFrame and its summaries to Parquet and keep them hot in memory"""
+        path = self._path(file_id)
+        table = self._to_arrow(df)
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[self.METADATA_KEY] = orjson.dumps(
+            {"metadata": metadata, "overview": overview},
+            default=str,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+        try:
+            pq.write_table(
+                table.replace_schema_metadata(schema_metadata), path, compression="zstd"
+            )
+        except Exception:
+            # Don't leave a truncated file that other workers would try to load
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            raise
+
+        with self._lock:
+            self._store(file_id, {"df": df, "metadata": metadata, "overview": overview})
+            self._evict()
+
+        self.sweep(keep=path)
+
+    @staticmethod
+    def _to_arrow(df: pd.DataFrame) -> pa.Table:
+        """Arrow table for the Parquet copy, storing mixed-type object columns as text"""
+        try:
+            return pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass
+
+        df = df.copy(deep=False)
+        for col in df.columns[(df.dtypes == object).to_numpy()]:
+            series = df[col]
+            try:
+                pa.array(series, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                df[col] = series.astype(str).where(series.notna(), None)
+        return pa.Table.from_pandas(df)
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Return the ``{"df", "metadata", "overview"}`` entry for a file ID, or None if unknown"""
+        path = self._path(file_id)
+        on_disk = path is not None and os.path.exists(path)
+
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None:
+                # Another worker sharing cache_dir may have deleted the file
+                if not on_disk:
+                    self._drop(file_id)
+                    return None
+                self._entries.move_to_end(file_id)
+                return entry
+
+        if not on_disk:
+            return None
+
+        table = pq.read_table(path, memory_map=True)
+        raw_metadata = (table.schema.metadata or {}).get(self.METADATA_KEY)
+        df = table.to_pandas(self_destruct=True)
+        if raw_metadata is not None:
+            entry = orjson.loads(raw_metadata)
+        else:
+            metadata = FileProcessingService._generate_metadata(df, f"file_{file_id}")
+            entry = {
+                "metadata": metadata,
+                "overview": FileProcessingService._generate_overview(df, metadata),
+            }
+        entry["df"] = df
+        with self._lock:
+            self._store(file_id, entry)
+            self._evict()
+        return entry
+
+    def invalidate(self, file_id: str) -> bool:
+        """Drop a file from memory and disk; return True if anything was removed"""
+        removed = False
+        with self._lock:
+            if file_id in self._entries:
+                self._drop(file_id)
+                removed = True
+
+        path = self._path(file_id)
+        if path is not None:
+            # A concurrent DELETE or sweep may remove the file first
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                removed = True
+        return removed
+
+    def sweep(self, keep: Optional[str] = None) -> None:
+        """Remove expired Parquet files, then the oldest ones while over max_disk_bytes"""
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                name, ext = os.path.splitext(entry.name)
+                # Only spill files; other caches may share the directory
+                if ext != ".parquet" or self._path(name) != entry.path:
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        cutoff = time.time() - self.disk_ttl
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if path == keep or (mtime >= cutoff and total <= self.max_disk_bytes):
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                logger.info("Removed cached upload %s", path)
+            total -= size
+
+    def __contains__(self, file_id: str) -> bool:
+        path = self._path(file_id)
+        return path is not None and os.path.exists(path)
+
+    def _store(self, file_id: str, entry: Dict[str, Any]) -> None:
+        if file_id in self._entries:
+            self._total_bytes -= self._sizes.pop(file_id)
+        size = FileProcessingService._estimate_memory_bytes(entry["df"])
+        self._entries[file_id] = entry
+        self._sizes[file_id] = size
+        self._total_bytes += size
+
+    def _drop(self, file_id: str) -> None:
+        del self._entries[file_id]
+        self._total_bytes -= self._sizes.pop(file_id)
+
+    def _evict(self) -> None:
+        # Evicted frames stay on disk and are reloaded on their next request
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            victim, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(victim)
+
+
+# Uploaded DataFrames, spilled to Parquet - shared by all services
+file_storage = FileCache(
+    cache_dir=os.getenv("FILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "analisis_cache")),
+    max_entries=int(os.getenv("FILE_CACHE_MAX_ENTRIES", "32")),
+    max_bytes=int(os.getenv("FILE_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+    disk_ttl=float(os.getenv("FILE_CACHE_TTL_HOURS", "24")) * 3600,
+    max_disk_bytes=int(os.getenv("FILE_CACHE_MAX_DISK_MB", "10240")) * 1024 * 1024,
+)
+
+# Dedicated pool for upload parsing so large uploads can't exhaust the default executor
+_parse_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FILE_PARSE_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="file-parse",
+)
 
 
 class FileProcessingService:
@@ -21,10 +235,23 @@ class FileProcessingService:
 
     ALLOWED_EXTENSIONS = {".csv", ".xlsx", ".xls", ".json"}
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+    PEEK_SIZE = 4096  # 4KB
+    ARROW_BLOCK_SIZE = 8 * 1024 * 1024  # 8MB
+    # pandas.read_csv's default na_values; the Arrow parser must treat the same cells as null
+    CSV_NA_VALUES = [
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+        "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+    ]
+    MEMORY_SAMPLE_ROWS = 1000
+    SUMMARY_STATISTICS = ["count", "mean", "std", "min", "max"]
+    _INT_DOWNCASTS = (np.int8, np.int16, np.int32)
 
     @staticmethod
-    def validate_file(filename: str, file_size: int) -> tuple[bool, str]:
-        """Validate file extension and size"""
+    def validate_file(
+        filename: str, file_size: int, peek: bytes = b""
+    ) -> tuple[bool, str]:
+        """Validate file extension, size and, when given, the leading bytes"""
         if not filename:
             return False, "Filename is required"
 
@@ -41,42 +268,174 @@ class FileProcessingService:
                 f"File size exceeds maximum allowed size of {FileProcessingService.MAX_FILE_SIZE // (1024 * 1024)}MB",
             )
 
+        if peek and not FileProcessingService._matches_signature(file_ext, peek):
+            return False, f"File content does not match the {file_ext} format"
+
         return True, "Valid file"
 
     @staticmethod
-    async def process_file(
-        file_content: bytes, filename: str
+    def _matches_signature(file_ext: str, head: bytes) -> bool:
+        """Sniff the first bytes of an upload for the format its extension claims"""
+        if file_ext == ".xlsx":
+            return head.startswith(b"PK\x03\x04")
+        if file_ext == ".xls":
+            return head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")
+        text = head.removeprefix(b"\xef\xbb\xbf")
+        if file_ext == ".json":
+            return text.lstrip()[:1] in (b"{", b"[")
+        # CSV: plain text, so no NUL bytes and no binary container header
+        return b"\x00" not in text and not text.startswith(b"PK\x03\x04")
+
+    @staticmethod
+    async def process_path(
+        file_path: str, filename: str
     ) -> tuple[str, pd.DataFrame, Dict[str, Any]]:
-        """Process uploaded file and return DataFrame with metadata"""
+        """Process an uploaded file saved on disk and return DataFrame with metadata"""
+        # Parsing, metadata and the Parquet write block, so run them as one job off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _parse_executor,
+            FileProcessingService._process_path_sync,
+            file_path,
+            filename,
+        )
+
+    @staticmethod
+    def _process_path_sync(
+        file_path: str, filename: str
+    ) -> tuple[str, pd.DataFrame, Dict[str, Any]]:
+        """Blocking part of process_path"""
         try:
             file_ext = os.path.splitext(filename)[1].lower()
 
             # Read file based on extension
-            if file_ext == ".csv":
-                df = pd.read_csv(io.BytesIO(file_content))
-            elif file_ext in [".xlsx", ".xls"]:
-                df = pd.read_excel(io.BytesIO(file_content))
-            elif file_ext == ".json":
-                df = pd.read_json(io.BytesIO(file_content))
-            else:
+            reader = FileProcessingService._READERS.get(file_ext)
+            if reader is None:
                 raise ValueError(f"Unsupported file type: {file_ext}")
+            df = reader(file_path)
+
+            # Shrink dtypes once so every later endpoint reads less memory
+            df = FileProcessingService._optimize_dtypes(df)
 
             # Generate unique file ID
             file_id = str(uuid.uuid4())
 
-            # Store DataFrame
-            file_storage[file_id] = df
-
-            # Generate metadata
+            # Generate metadata once; it is cached alongside the DataFrame
             metadata = FileProcessingService._generate_metadata(df, filename)
+            overview = FileProcessingService._generate_overview(df, metadata)
+
+            # Store DataFrame
+            file_storage.put(file_id, df, metadata, overview)
 
-            logger.info(f"Successfully processed file {filename} with ID {file_id}")
+            logger.info("Successfully processed file %s with ID %s", filename, file_id)
             return file_id, df, metadata
 
         except Exception as e:
-            logger.error(f"Error processing file {filename}: {str(e)}")
+            logger.error("Error processing file %s: %s", filename, e)
             raise ValueError(f"Error processing file: {str(e)}")
 
+    @staticmethod
+    def _arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+        """Convert an Arrow table to pandas, releasing Arrow buffers as columns are converted"""
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    @staticmethod
+    def _read_csv(file_path: str) -> pd.DataFrame:
+        """Read a CSV with the multithreaded Arrow parser, falling back to the C engine"""
+        try:
+            table = pa_csv.read_csv(
+                file_path,
+                read_options=pa_csv.ReadOptions(
+                    use_threads=True, block_size=FileProcessingService.ARROW_BLOCK_SIZE
+                ),
+                # Arrow keeps blank and "NA" text cells as strings unless told otherwise
+                convert_options=pa_csv.ConvertOptions(
+                    null_values=FileProcessingService.CSV_NA_VALUES,
+                    strings_can_be_null=True,
+                ),
+            )
+            return FileProcessingService._arrow_to_pandas(table)
+        except Exception as e:
+            logger.warning("Arrow CSV parser failed, falling back to C engine: %s", e)
+            return pd.read_csv(file_path)
+
+    @staticmethod
+    def _read_json(file_path: str) -> pd.DataFrame:
+        """Read newline-delimited JSON with Arrow, falling back to pandas for other layouts"""
+        try:
+            table = pa_json.read_json(
+                file_path,
+                read_options=pa_json.ReadOptions(
+                    use_threads=True, block_size=FileProcessingService.ARROW_BLOCK_SIZE
+                ),
+            )
+        except Exception as e:
+            logger.info("Arrow JSON reader could not parse file, using pandas: %s", e)
+            return pd.read_json(file_path)
+
+        # Nested columns mean a column-oriented JSON document, which pandas lays out correctly
+        if any(pa.types.is_nested(field.type) for field in table.schema):
+            return pd.read_json(file_path)
+        return FileProcessingService._arrow_to_pandas(table)
+
+    @staticmethod
+    def _read_excel(file_path: str) -> pd.DataFrame:
+        """Read an Excel file with the Rust calamine parser, falling back to openpyxl/xlrd"""
+        try:
+            return pd.read_excel(file_path, engine="calamine")
+        except Exception as e:
+            logger.warning("Calamine Excel parser failed, falling back to default engine: %s", e)
+            return pd.read_excel(file_path)
+
+    @staticmethod
+    def _optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast numeric columns and turn low-cardinality text columns into categoricals"""
+        n_rows = len(df)
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_bool_dtype(series):
+                continue
+            if pd.api.types.is_integer_dtype(series) and n_rows:
+                # Pick the smallest width that also holds max - min, so differences can't overflow
+                lo, hi = int(series.min()), int(series.max())
+                for dtype in FileProcessingService._INT_DOWNCASTS:
+                    info = np.iinfo(dtype)
+                    if info.min <= lo and hi <= info.max and hi - lo <= info.max:
+                        df[col] = series.astype(dtype)
+                        break
+            elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+                # Only downcast when every value survives the round trip exactly
+                downcast = series.astype(np.float32)
+                if np.array_equal(downcast.to_numpy(np.float64), series.to_numpy(), equal_nan=True):
+                    df[col] = downcast
+            elif series.dtype == object and n_rows:
+                try:
+                    if series.nunique() / n_rows < 0.5:
+                        df[col] = series.astype("category")
+                except TypeError:
+                    # Lists and dicts (nested JSON) are unhashable; keep them as objects
+                    continue
+        return df
+
+    @staticmethod
+    def _estimate_memory_bytes(df: pd.DataFrame) -> int:
+        """Estimate DataFrame memory, sampling object columns instead of sizing every string"""
+        total = int(df.memory_usage(index=True, deep=False).sum())
+        n_rows = len(df)
+        sample_size = FileProcessingService.MEMORY_SAMPLE_ROWS
+        for col in df.columns:
+            series = df[col]
+            if series.dtype != object or not n_rows:
+                continue
+            if n_rows <= sample_size:
+                deep = series.memory_usage(index=False, deep=True)
+            else:
+                sample = series.sample(n=sample_size, random_state=0)
+                deep = sample.memory_usage(index=False, deep=True) * n_rows / sample_size
+            # Shallow usage already counted the object pointers
+            total += int(deep) - int(series.memory_usage(index=False, deep=False))
+        return total
+
     @staticmethod
     def _generate_metadata(df: pd.DataFrame, filename: str) -> Dict[str, Any]:
         """Generate comprehensive metadata for the DataFrame"""
@@ -89,10 +448,17 @@ class FileProcessingService:
                 "data_types": df.dtypes.astype(str).to_dict(),
             }
 
-            # Categorize columns
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-            categorical_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-            datetime_cols = df.select_dtypes(include=["datetime64"]).columns.tolist()
+            # Categorize columns in a single pass over the dtypes
+            numeric_cols, categorical_cols, datetime_cols = [], [], []
+            for col, dtype in df.dtypes.items():
+                if pd.api.types.is_bool_dtype(dtype):
+                    continue
+                if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+                    numeric_cols.append(col)
+                elif dtype == object or isinstance(dtype, pd.CategoricalDtype):
+                    categorical_cols.append(col)
+                elif pd.api.types.is_datetime64_dtype(dtype):
+                    datetime_cols.append(col)
 
             metadata.update(
                 {
@@ -100,13 +466,16 @@ class FileProcessingService:
                     "categorical_columns": categorical_cols,
                     "datetime_columns": datetime_cols,
                     "missing_values": df.isnull().sum().to_dict(),
-                    "memory_usage": f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB",
+                    "memory_usage": f"{FileProcessingService._estimate_memory_bytes(df) / 1024 / 1024:.2f} MB",
                 }
             )
 
             # Statistical summary for numeric columns
             if numeric_cols:
-                metadata["summary_stats"] = df[numeric_cols].describe().to_dict()
+                # Quantiles need a partition per column, so they are left out of the summary
+                metadata["summary_stats"] = (
+                    df[numeric_cols].agg(FileProcessingService.SUMMARY_STATISTICS).to_dict()
+                )
 
             # Sample data (first 5 rows)
             metadata["sample_data"] = df.head().to_dict("records")
@@ -114,6 +483,27 @@ class FileProcessingService:
             return metadata
 
         except Exception as e:
-            logger.error(f"Error generating metadata: {str(e)}")
+            logger.error("Error generating metadata: %s", e)
             return {"error": f"Error generating metadata: {str(e)}"}
 
+    @staticmethod
+    def _generate_overview(df: pd.DataFrame, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate the data overview returned with AI analysis results"""
+        missing_values = metadata.get("missing_values", {})
+        return {
+            "total_rows": df.shape[0],
+            "total_columns": df.shape[1],
+            "numeric_columns": metadata.get("numeric_columns", []),
+            "categorical_columns": metadata.get("categorical_columns", []),
+            "missing_values_count": int(
+                np.fromiter(missing_values.values(), dtype=np.int64, count=len(missing_values)).sum()
+            ),
+        }
+
+    # Extension -> reader, built once when the class body executes
+    _READERS: ClassVar[Dict[str, Callable[[str], pd.DataFrame]]] = {
+        ".csv": _read_csv.__func__,
+        ".xlsx": _read_excel.__func__,
+        ".xls": _read_excel.__func__,
+        ".json": _read_json.__func__,
+    }
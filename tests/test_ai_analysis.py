@@ -0,0 +1,18 @@
+import pandas as pd
+
+from services.ai_analysis import AIAnalysisService
+
+
+def test_schema_hash_handles_list_valued_columns():
+    df = pd.DataFrame({
+        "name": ["a", "b", "c"],
+        "tags": [["x", "y"], [], ["z"]],
+        "meta": [{"k": 1}, {"k": 2}, {}],
+    })
+
+    key = AIAnalysisService._schema_hash(df)
+
+    assert key == AIAnalysisService._schema_hash(df.copy())
+    changed = df.copy()
+    changed.at[0, "tags"] = ["x"]
+    assert key != AIAnalysisService._schema_hash(changed)
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from services.file_processing import FileProcessingService
+
+
+def test_read_csv_matches_pandas_missing_values(tmp_path):
+    path = tmp_path / "blanks.csv"
+    path.write_text(
+        "a,b,c,d\n"
+        "x,1,NA,2.5\n"
+        ",2,,\n"
+        "NA,,y,N/A\n"
+        "z,4,null,1.0\n"
+    )
+
+    df = FileProcessingService._read_csv(str(path))
+    expected = pd.read_csv(path)
+
+    assert df.isna().sum().to_dict() == expected.isna().sum().to_dict()
+    assert df.isna().equals(expected.isna())